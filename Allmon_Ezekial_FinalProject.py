@@ -1,13 +1,72 @@
 import os
-import pandas as pd
+import queue
+import socket
+import tempfile
+import uuid
 from breezypythongui import EasyFrame
-from tkinter import Label, Text, DISABLED
-from tkinter import filedialog
-from PIL import Image, ImageTk
+from tkinter import Label, PhotoImage, Text, DISABLED, NORMAL
+from tkinter import filedialog, ttk
+# pandas and numpy (through derby_analysis, derby_roster, derby_schedule, derby_server and derby_workbook)
+# and PIL are imported where they are first needed, so the window opens without loading them
+import derby_profile
+import derby_timer
+from derby_grid import VirtualGrid
+from derby_journal import HeatJournal, journal_path
+from derby_store import JOURNAL_MODE_ENV, RaceStore, StoreConflict
+from derby_worker import StoreWorker
+
+# Logo shown at the top of the main window, and the copy scaled to LOGO_SIZE that is loaded at startup
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGO_PATH = os.path.join(APP_DIR, "logo.PNG")
+LOGO_CACHE_PATH = os.path.join(APP_DIR, "logo_100.png")
+LOGO_SIZE = (100, 100)
+
+# Limits for the pack size and track
+MAX_RACERS = 999
+MAX_LANES = 8
+
+# How often the main loop checks for heats finished by the electronic timer
+TIMER_POLL_MS = 50
+
+# How often the main loop picks up finished saves from the background writer
+WORKER_POLL_MS = 100
+
+def scaled_logo_path():
+    """
+    Returns a PNG of the logo scaled to LOGO_SIZE, which Tk loads directly.
+    The pre-scaled logo_100.png shipped next to the program is always used as is; replace it along with logo.PNG,
+    or delete it to have it made again. Without it, a copy is made with PIL, next to the program or in the temp
+    folder if the program folder is read-only. If PIL cannot make one, an older copy in the temp folder is used.
+    """
+    if os.path.exists(LOGO_CACHE_PATH):
+        return LOGO_CACHE_PATH
+
+    temp_copy = os.path.join(tempfile.gettempdir(), "derby_logo_100.png")
+    if os.path.exists(temp_copy) and os.path.getmtime(temp_copy) >= os.path.getmtime(LOGO_PATH):
+        return temp_copy
+
+    try:
+        from PIL import Image
+
+        image = Image.open(LOGO_PATH).resize(LOGO_SIZE)
+    except (ImportError, OSError):
+        if os.path.exists(temp_copy):
+            return temp_copy
+        raise
+    for path in (LOGO_CACHE_PATH, temp_copy):
+        try:
+            image.save(path, optimize=True)
+            return path
+        except OSError:
+            continue
+    if os.path.exists(temp_copy):
+        return temp_copy
+    raise OSError("Could not save the scaled logo")
+
 
 class DerbyLapTracker(EasyFrame):
-       """
-    A GUI-based application to track and analyze race results for two aspiring racers competing in a Boy Scout Pinewood derby. This program tracks 10 races for up to 2 racers, and can help troubleshoot the car, and help achieve the fastest times.
+    """
+    A GUI-based application to track and analyze race results for a pack of aspiring racers competing in a Boy Scout Pinewood derby. This program tracks any number of heats for up to 999 racers on a track of up to 8 lanes, and can help troubleshoot the car, and help achieve the fastest times.
     The program allows users to enter racer details, save race times, and analyze race results.
     """
     def __init__(self):
@@ -19,12 +78,9 @@ class DerbyLapTracker(EasyFrame):
             self.grid_columnconfigure(col, weight=1)
 
         # Load and display the logo image
-        logo_path = "logo.png"
-        if os.path.exists(logo_path):
+        if os.path.exists(LOGO_PATH) or os.path.exists(LOGO_CACHE_PATH):
             try:
-                image = Image.open(logo_path)
-                image = image.resize((100, 100))
-                self.logo = ImageTk.PhotoImage(image)
+                self.logo = PhotoImage(file=scaled_logo_path())
                 self.addLabel(text="", row=0, column=0, columnspan=4)
                 self.logo_label = Label(self, image=self.logo)
                 self.logo_label.grid(row=0, column=0, columnspan=4, sticky="NSEW")
@@ -37,12 +93,12 @@ class DerbyLapTracker(EasyFrame):
 
         # Application description
         description = (
-            "This application will track race data for two racers, one car each.\n"
-            "After races are completed, and all data is manually entered (race times, lap numbers, race lane, etc),\n"
+            "This application will track race data for a pack of racers, one car each.\n"
+            "After each heat is run, and its data is entered (car number and race time for each lane),\n"
             "the program will output:\n"
             "- Fastest car on each lane\n"
             "- Average lap times for each car on each lane\n"
-            "- Average lap times for each car on both lanes."
+            "- Average lap times for each car on all lanes."
         )
         text_area = Text(self, wrap="word", height=9, width=60)
         text_area.insert("1.0", description)
@@ -50,18 +106,38 @@ class DerbyLapTracker(EasyFrame):
         text_area.grid(row=1, column=0, columnspan=4, sticky="W")
 
         # Row 2: Inputs for number of racers and lanes
-        self.addLabel(text="Number of Racers (max 2):", row=2, column=0, sticky="W")
+        self.addLabel(text=f"Number of Racers (max {MAX_RACERS}):", row=2, column=0, sticky="W")
         self.racerEntry = self.addTextField(text="", row=2, column=1)
-        self.addLabel(text="Number of Lanes (max 2):", row=2, column=2, sticky="W")
+        self.addLabel(text=f"Number of Lanes (max {MAX_LANES}):", row=2, column=2, sticky="W")
         self.laneEntry = self.addTextField(text="", row=2, column=3)
 
         # Confirm button to validate and display racer detail fields
         self.addButton(text="Confirm", row=3, column=2, command=self.confirmAction)
+        self.addButton(text="Analyze Workbook", row=3, column=3, command=self.analyzeWorkbook)
+
+        # Save progress, updated while the background writer has work queued
+        self.saveStatus = self.addLabel(text="", row=13, column=0, columnspan=2, sticky="W")
+        self.saveProgress = ttk.Progressbar(self, mode="indeterminate", length=200)
+        self.saveProgress.grid(row=13, column=2, columnspan=2, sticky="W")
 
-        # Initialize racer count and store racer names
+        self.initState()
+
+    def initState(self):
+        """Sets up everything the tracker keeps besides its main window widgets."""
+        # Initialize racer count and store racer names by car number
         self.racerCount = 0
-        self.racer1Name = None  
-        self.racer2Name = None  
+        self.racerNames = {}
+        self.store = None
+        self.standings = None  # Running statistics, created when results are first analyzed
+        self.standingsArea = None
+        self.timerReader = None
+        self.worker = None
+        self.schedule = None  # Heat chart, one list of car numbers per heat
+        self.raceWindow = None
+        self.heatGrid = None  # Virtualized table of heats on the race entry screen
+        self.enteredHeats = {}  # Heats queued for the background writer, by heat number: {lane: (car number, time)}
+        self.standingsServer = None  # Live standings for spectator displays
+        self.workbookCache = None  # Parsed archived workbooks, re-parsed only when the file changes; created on first use
 
     def confirmAction(self):
         """Validate racer and lane input values and create fields for racer details."""
@@ -75,20 +151,20 @@ class DerbyLapTracker(EasyFrame):
             self.messageBox("Error", "Please enter valid integer numbers for racers and lanes.")
             return
         
-        if racers < 1 or racers > 2:
-            self.messageBox("Error", "Number of racers must be 1 or 2.")
+        if racers < 1 or racers > MAX_RACERS:
+            self.messageBox("Error", f"Number of racers must be between 1 and {MAX_RACERS}.")
             return
 
-        if lanes < 1 or lanes > 2:
-            self.messageBox("Error", "Number of lanes must be 1 or 2.")
+        if lanes < 1 or lanes > MAX_LANES:
+            self.messageBox("Error", f"Number of lanes must be between 1 and {MAX_LANES}.")
             return
 
         if hasattr(self, 'detailFieldsCreated'):
             return
         self.detailFieldsCreated = True
+        self.racers = racers
+        self.lanes = lanes
 
-        self.addLabel(text="Racer Number (1 or 2):", row=4, column=0, sticky="W")
-        self.racerNumberField = self.addTextField(text="", row=4, column=1)
         self.addLabel(text="Racer Name:", row=5, column=0, sticky="W")
         self.racerNameField = self.addTextField(text="", row=5, column=1)
         self.addLabel(text="Boy Scout Rank:", row=6, column=0, sticky="W")
@@ -103,11 +179,11 @@ class DerbyLapTracker(EasyFrame):
         self.modsArea = self.addTextArea(text="", row=10, column=1, width=50, height=8)
 
         self.saveRacerButton = self.addButton(text="Save Racer", row=11, column=0, columnspan=2, command=self.saveRacer)
+        self.addButton(text="Import Roster", row=11, column=2, command=self.importRoster)
 
     def saveRacer(self):
-        """Saves racer data and ensures both racers are saved to the spreadsheet. File Explorer pop up asking user to name new file, or select existing file to record data"""
+        """Saves racer data and ensures both racers are saved to the race data file. File Explorer pop up asking user to name new file, or select existing file to record data"""
         try:
-            racer_number = self.racerNumberField.getText().strip()
             racer_name = self.racerNameField.getText().strip()
             rank = self.rankField.getText().strip()
             car_name = self.carNameField.getText().strip()
@@ -116,148 +192,291 @@ class DerbyLapTracker(EasyFrame):
             mods = self.modsArea.get("1.0", "end").strip()
 
             # Ensure all fields are filled before saving
-            if not racer_number or not racer_name or not car_name or not car_number or not car_weight:
+            if not racer_name or not car_name or not car_number or not car_weight:
                 self.messageBox("Error", "All fields must be filled in before saving.")
                 return
 
-            # Store racer names for use in results display
-            if racer_number == "1":
-                self.racer1Name = racer_name
-            elif racer_number == "2":
-                self.racer2Name = racer_name
-
-            # Create a DataFrame with racer details
-            new_df = pd.DataFrame({
-                "Racer Number": [racer_number],
-                "Racer Name": [racer_name],
-                "Boy Scout Rank": [rank],
-                "Car Name": [car_name],
-                "Car Number": [car_number],
-                "Car Weight": [car_weight],
-                "Mods": [mods]
-            })
-
-            # Ask user to choose a save location for the first time
-            if not hasattr(self, "file_path") or not self.file_path:
-                self.file_path = filedialog.asksaveasfilename(
-                    defaultextension=".xlsx",
-                    filetypes=[("Excel Files", "*.xlsx")],
-                    title="Choose a location to save race data"
-                )
-
-            # Ensure the user selected a valid file path
-            if not self.file_path:
-                self.messageBox("Error", "No file selected. Please select a file to save race data.")
+            # Car numbers identify each racer's results, so they must be unique
+            if not car_number.isdigit() or not 1 <= int(car_number) <= 999:
+                self.messageBox("Error", "Car number must be a whole number from 1 to 999.")
+                return
+            car_number = int(car_number)
+            if car_number in self.racerNames:
+                self.messageBox("Error", f"Car number {car_number} is already registered.")
+                return
+
+            # Collect the racer details
+            racer = {
+                "Racer Name": racer_name,
+                "Boy Scout Rank": rank,
+                "Car Name": car_name,
+                "Car Number": car_number,
+                "Car Weight": car_weight,
+                "Mods": mods
+            }
+
+            # Ask user to choose the race data file the first time
+            if not self.openStore():
                 return
 
-            # Check if the file exists, otherwise create it
-            if not os.path.exists(self.file_path):
-                # Create a new Excel file with an empty DataFrame
-                with pd.ExcelWriter(self.file_path, engine="openpyxl", mode="w") as writer:
-                    new_df.to_excel(writer, sheet_name="Racer Details", index=False)
+            # Append only the new racer row, in the background; it counts as registered once it is in the file
+            self.worker.submit(
+                lambda store: store.add_racer(racer),
+                on_done=lambda _: self.racerSaved(racer),
+                on_error=self.racerSaveFailed
+            )
 
-            else:
-                # Load existing file
-                try:
-                    existing_df = pd.read_excel(self.file_path, sheet_name="Racer Details", engine="openpyxl")
+        except Exception as e:
+            self.messageBox("Error", f"Failed to save racer details: {e}")
 
-                    # Ensure all required columns exist in the existing DataFrame
-                    for col in ["Racer Number", "Racer Name", "Boy Scout Rank", "Car Name", "Car Number", "Car Weight", "Mods"]:
-                        if col not in existing_df.columns:
-                            existing_df[col] = ""
+    def racerSaved(self, racer):
+        """Registers a racer once the background writer has saved it, and moves on to the next one."""
+        # Store racer names for use in results display
+        self.racerNames[racer["Car Number"]] = racer["Racer Name"]
 
-                    # Append new data
-                    df = pd.concat([existing_df, new_df], ignore_index=True)
+        self.messageBox("Success", f"Racer {racer['Racer Name']} (car {racer['Car Number']}) details saved successfully!")
 
-                except ValueError:
-                    df = new_df  # If the sheet does not exist, create a new one
+        self.racerCount += 1  # Increment racer count
 
-                # Save the updated DataFrame back to the Excel file
-                with pd.ExcelWriter(self.file_path, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-                    df.to_excel(writer, sheet_name="Racer Details", index=False)
+        if self.racerCount < self.racers:
+            self.clearRacerFields()
+            self.messageBox("Info", "Racer details saved. Enter the next racer's info.")
+        else:
+            self.messageBox("Info", "Maximum number of racers reached.")
+            self.showRaceTimesButton()
+
+    def importRoster(self):
+        """Registers every racer in a .csv or .xlsx roster at once, after checking all of its rows."""
+        path = filedialog.askopenfilename(
+            filetypes=[("Roster Files", "*.csv *.xlsx"), ("CSV Files", "*.csv"), ("Excel Files", "*.xlsx")],
+            title="Choose a roster to import"
+        )
+        if not path:
+            return
+
+        import derby_roster
 
-            self.messageBox("Success", f"Racer {racer_number} details saved successfully!")
+        try:
+            roster = derby_roster.read_roster(path)
 
-            self.racerCount += 1  # Increment racer count
+            # Ask user to choose the race data file the first time, so its cars count as registered
+            if not self.openStore():
+                return
 
-            if self.racerCount < 2:
-                self.clearRacerFields()
-                self.messageBox("Info", "Racer details saved. Enter the next racer's info.")
-            else:
-                self.messageBox("Info", "Maximum number of racers reached.")
-                self.addButton(text="Enter Race Times", row=12, column=0, columnspan=2, command=self.openRaceEntryScreen)
+            # Include cars registered at other stations sharing the file
+            self.racerNames.update(self.store.racer_names())
+            racers, errors = derby_roster.validate_roster(roster, registered=self.racerNames)
+            if errors:
+                shown = "\n".join(errors[:20])
+                more = f"\n...and {len(errors) - 20} more" if len(errors) > 20 else ""
+                self.messageBox("Error", f"Nothing was imported. Fix these rows and try again:\n{shown}{more}")
+                return
+            if racers.empty:
+                self.messageBox("Error", "The roster has no racers.")
+                return
+
+            # Write the whole roster in one batch, in the background; the racers count as registered once it is done
+            records = racers.to_dict("records")
+            names = dict(zip(racers["Car Number"].tolist(), racers["Racer Name"]))
+            self.worker.submit(
+                lambda store: store.add_racers(records),
+                on_done=lambda _: self.rosterImported(names, os.path.basename(path)),
+                on_error=self.racerSaveFailed
+            )
 
         except Exception as e:
-            self.messageBox("Error", f"Failed to save racer details: {e}")
+            self.messageBox("Error", f"Failed to import roster: {e}")
+
+    def rosterImported(self, names, file_name):
+        """Registers an imported roster ({car number: racer name}) once the background writer has saved it."""
+        self.racerNames.update(names)
+        self.racerCount += len(names)
+        self.racers = max(self.racers, self.racerCount)
+        self.messageBox("Success", f"Imported {len(names)} racers from {file_name}.")
+        if self.racerCount >= self.racers:
+            self.showRaceTimesButton()
+
+    def showRaceTimesButton(self):
+        """Adds the button that opens the race entry screen, once."""
+        if getattr(self, "raceTimesButton", None) is None:
+            self.raceTimesButton = self.addButton(text="Enter Race Times", row=12, column=0, columnspan=2, command=self.openRaceEntryScreen)
 
 
     def saveRaceTime(self):
-        """Saves race time data for 10 races to an Excel file."""
+        """Saves the car number and race time for each lane of the current heat to the race data file."""
         try:
-            race_data = {
-                "Race #": [],
-                "Racer 1 - Lane": [],
-                "Racer 1 - Time": [],
-                "Racer 2 - Lane": [],
-                "Racer 2 - Time": []
-            }
-
-            # Collect race data from the input fields
-            for i in range(10):  # Loop through 10 races
-                race_data["Race #"].append(i + 1)
-                race_data["Racer 1 - Lane"].append(int(self.laneFields1[i].getText().strip()))
-                race_data["Racer 1 - Time"].append(float(self.timeFields1[i].getText().strip()))
-                race_data["Racer 2 - Lane"].append(int(self.laneFields2[i].getText().strip()))
-                race_data["Racer 2 - Time"].append(float(self.timeFields2[i].getText().strip()))
-
-            new_df = pd.DataFrame(race_data)
-
-            # Ask user to choose a save location for the first time
-            if not hasattr(self, "file_path") or not self.file_path:
-                self.file_path = filedialog.asksaveasfilename(
-                    defaultextension=".xlsx",
-                    filetypes=[("Excel Files", "*.xlsx")],
-                    title="Choose a location to save race data"
-                )
-
-            # Ensure the user selected a valid file path
-            if not self.file_path:
-                self.messageBox("Error", "No file selected. Please select a file to save race data.")
+            results = []
+
+            # Collect one result per lane that had a car in it
+            for lane in range(self.lanes):
+                car_text = self.carFields[lane].getText().strip()
+                time_text = self.timeFields[lane].getText().strip()
+                if not car_text and not time_text:
+                    continue  # Empty lane in this heat
+
+                car_number = int(car_text)
+                if car_number not in self.racerNames and self.store is not None:
+                    # Another station sharing the file may have registered it
+                    self.racerNames.update(self.store.racer_names())
+                if car_number not in self.racerNames:
+                    self.messageBox("Error", f"Car {car_number} on lane {lane + 1} is not registered.")
+                    return
+                results.append({
+                    "Heat": self.heatNumber,
+                    "Lane": lane + 1,
+                    "Car Number": car_number,
+                    "Time": float(time_text)
+                })
+
+            if not results:
+                self.messageBox("Error", "Enter a car number and time for at least one lane.")
                 return
 
-            # Check if the file exists
-            if os.path.exists(self.file_path):
-                try:
-                    # Load existing race time data
-                    existing_df = pd.read_excel(self.file_path, sheet_name="Race Times", engine="openpyxl")
+            car_numbers = [result["Car Number"] for result in results]
+            if len(set(car_numbers)) != len(car_numbers):
+                self.messageBox("Error", "A car can only run on one lane per heat.")
+                return
 
-                    # Ensure all required columns exist
-                    for col in ["Race #", "Racer 1 - Lane", "Racer 1 - Time", "Racer 2 - Lane", "Racer 2 - Time"]:
-                        if col not in existing_df.columns:
-                            existing_df[col] = ""
+            # Ask user to choose the race data file the first time
+            if not self.openStore():
+                return
 
-                    # Append new race data
-                    df = pd.concat([existing_df, new_df], ignore_index=True)
+            # On disk in the journal first, so a crash before the background write loses nothing
+            heat = self.heatNumber
+            entry = uuid.uuid4().hex
+            self.journal.append(heat, entry, results)
+
+            # Append only the new heat rows, in the background so the next heat can be entered right away.
+            # The file picks the final heat number, in case another station saved this one first.
+            self.worker.add_heat(
+                heat, entry, results,
+                on_done=lambda saved: self.heatSaved(heat, saved),
+                on_error=self.heatSaveFailed
+            )
 
-                except ValueError:
-                    # If the sheet does not exist, create it
-                    df = new_df
-            else:
-                # If the file does not exist, create a new one
-                df = new_df  
+            # Shown in the heat grid until the background writer has saved them
+            self.enteredHeats[heat] = {result["Lane"]: (result["Car Number"], result["Time"]) for result in results}
 
-            # Save the updated DataFrame back to the Excel file
-            with pd.ExcelWriter(self.file_path, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-                df.to_excel(writer, sheet_name="Race Times", index=False)
+            # Update the running statistics without re-reading the file
+            if self.standings is not None:
+                self.standings.add_heat(results)
+                self.refreshStandings()
+                self.publishStandings(results)
 
-            self.messageBox("Success", "Race times for 10 races saved successfully!")
+            self.heatNumber += 1
+            self.clearRaceFields()
 
         except Exception as e:
             self.messageBox("Error", f"Failed to save race times: {e}")
 
+    def heatSaved(self, heat, saved):
+        """Stops showing a heat from memory once the background writer has saved it; the grid now reads it from the file."""
+        self.enteredHeats.pop(heat, None)
+        if saved == heat:
+            if self.heatGrid is not None:
+                self.heatGrid.redraw()  # Same rows, so the operator's scroll position is kept
+            return
+
+        # Another station saved this heat number first, so the file saved it under the next free one
+        self.messageBox("Info", f"Another station already saved heat {heat}; these times were saved as heat {saved}.")
+        self.heatNumber = max(self.heatNumber, self.store.next_heat())
+        self.heatLabel["text"] = f"Heat {self.heatNumber}"
+        self.refreshHeatGrid()
+
+    def racerSaveFailed(self, error):
+        """Reports racers the background writer could not save, e.g. car numbers another station registered first."""
+        self.messageBox("Error", f"Failed to save racer details: {error}")
+        if isinstance(error, StoreConflict):
+            # The rest of the save went through; register what the file now holds
+            self.racerNames.update(self.store.racer_names())
+            self.racerCount = len(self.racerNames)
+            self.racers = max(self.racers, self.racerCount)
+            if self.racerCount >= self.racers:
+                self.showRaceTimesButton()
+
+    def heatSaveFailed(self, error):
+        """Reports heat results the background writer could not save, e.g. while the shared file was unreachable."""
+        self.messageBox("Error", f"Failed to save race times: {error}\n"
+                                 f"They are kept in the journal and saved the next time the race data file is opened.")
+
+    def openStore(self):
+        """Opens the race data file, asking the user to choose one the first time. Returns False if no file was selected."""
+        if self.store is not None:
+            return True
+
+        self.file_path = filedialog.asksaveasfilename(
+            defaultextension=".db",
+            filetypes=[("Race Data Files", "*.db")],
+            title="Choose a location to save race data"
+        )
+
+        # Ensure the user selected a valid file path
+        if not self.file_path:
+            self.messageBox("Error", "No file selected. Please select a file to save race data.")
+            return False
+
+        try:
+            self.store = RaceStore(self.file_path)
+        except Exception as e:
+            self.messageBox("Error", f"Failed to open the race data file {self.file_path}: {e}")
+            return False
+        if self.store.journal_mode != self.store.requested_journal_mode:
+            self.messageBox("Warning",
+                            f"The race data file is using the {self.store.journal_mode} journal mode, not "
+                            f"{self.store.requested_journal_mode}, because another station has it open that way. "
+                            f"Set {JOURNAL_MODE_ENV} to the same mode on every station sharing the file.")
+
+        # Write any heats that were journaled but not saved when the program last stopped
+        self.journal = HeatJournal(journal_path(self.file_path))
+        try:
+            recovered = self.journal.replay(self.store)
+            if recovered:
+                self.messageBox("Info", f"Recovered {len(recovered)} heat(s) from the journal: {', '.join(map(str, recovered))}")
+        except Exception as e:
+            self.messageBox("Error", f"Failed to recover heats from the journal {self.journal.path}: {e}")
+
+        # Pick up racers already registered in an existing file
+        self.racerNames.update(self.store.racer_names())
+        self.racerCount = len(self.racerNames)
+
+        # All writes and heavy reads go through a single background writer
+        self.worker = StoreWorker(self.file_path, self.journal)
+        self.worker.start()
+        self.after(WORKER_POLL_MS, self.pollWorker)
+        return True
+
+    def pollWorker(self):
+        """Reports finished background saves and shows progress while work is queued."""
+        self.worker.poll()
+        if self.worker.pending:
+            self.saveStatus["text"] = f"Saving... ({self.worker.pending} pending)"
+            self.saveProgress.start()
+        else:
+            self.saveStatus["text"] = "All changes saved"
+            self.saveProgress.stop()
+        self.after(WORKER_POLL_MS, self.pollWorker)
+
+    def exportRaceData(self):
+        """Exports racer details and race times to an Excel workbook, Parquet or Feather file chosen by the user."""
+        if not self.openStore():
+            return
+
+        export_path = filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            filetypes=[("Excel Files", "*.xlsx"), ("Parquet Files", "*.parquet"), ("Feather Files", "*.feather")],
+            title="Choose a location to export race data"
+        )
+        if not export_path:
+            return
+
+        self.worker.submit(
+            lambda store: store.export(export_path),
+            on_done=lambda _: self.messageBox("Success", f"Race data exported to {export_path}"),
+            on_error=lambda e: self.messageBox("Error", f"Failed to export race data: {e}")
+        )
+
     def clearRacerFields(self):
         """Clears all racer input fields after saving."""
-        self.racerNumberField.setText("")
         self.racerNameField.setText("")
         self.rankField.setText("")
         self.carNameField.setText("")
@@ -265,126 +484,363 @@ class DerbyLapTracker(EasyFrame):
         self.carWeightField.setText("")
         self.modsArea.setText("")
 
-    '''  Removed this so all racer 1 and 2 times would still be displayed when race times analyzed is showing
     def clearRaceFields(self):
-        """Clears the race time and lane input fields in the race entry window."""
-        for field in self.laneFields1:
+        """Clears the car and time input fields and shows the number of the next heat."""
+        for field in self.carFields:
             field.setText("")
-        for field in self.laneFields2:
+        for field in self.timeFields:
             field.setText("")
-        for field in self.timeFields1:
-            field.setText("")
-        for field in self.timeFields2:
-            field.setText("")'''
+        self.heatLabel["text"] = f"Heat {self.heatNumber}"
+        self.fillScheduledCars()
+        self.refreshHeatGrid()
+
+    def generateSchedule(self):
+        """Generates a lane-balanced heat chart for the registered cars and fills in each heat's cars as it comes up."""
+        import derby_schedule
 
+        rounds_text = self.prompterBox(title="Generate Schedule", promptString="Times each car runs each lane:", inputText="1").strip()
+        try:
+            rounds = int(rounds_text)
+        except ValueError:
+            self.messageBox("Error", "Please enter a whole number of rounds.")
+            return
+        if rounds < 1 or not self.racerNames:
+            self.messageBox("Error", "Register racers and enter at least 1 round to generate a schedule.")
+            return
+
+        self.schedule = derby_schedule.generate_schedule(sorted(self.racerNames), self.lanes, rounds)
+        self.scheduleStart = self.heatNumber
+        self.fillScheduledCars()
+        self.refreshHeatGrid()
+        self.messageBox("Info", f"Scheduled {len(self.schedule)} heats; each car runs each lane {rounds} time(s).")
+
+    def fillScheduledCars(self):
+        """Fills in the car number on each lane for the current heat from the schedule, if there is one."""
+        if self.schedule is None:
+            return
+        index = self.heatNumber - self.scheduleStart
+        if not 0 <= index < len(self.schedule):
+            return
+        for field, car_number in zip(self.carFields, self.scheduledCars(self.heatNumber)):
+            field.setText("" if car_number is None else str(car_number))
+        self.heatLabel["text"] = f"Heat {self.heatNumber} ({index + 1} of {len(self.schedule)} scheduled)"
 
     def openRaceEntryScreen(self):
-        """Opens a pop-up window for entering race times for both racers for 10 races, with properly aligned fields."""
-        self.raceWindow = EasyFrame(title="Enter Race Times", width=1500, height=1150)
+        """Opens a pop-up window for entering the car number and race time on each lane, one heat at a time."""
+        if not self.openStore():
+            return
+
+        # Bring back the window that is already open instead of building a second one
+        if self.raceWindow is not None and self.raceWindow.winfo_exists():
+            self.raceWindow.tkraise()
+            self.refreshHeatGrid()
+            return
+
+        self.raceWindow = EasyFrame(title="Enter Race Times", width=600, height=480 + 40 * self.lanes)
+
+        # Continue numbering after any heats already in the race data file
+        self.heatNumber = max(self.store.next_heat(), getattr(self, "heatNumber", 1))
+        self.heatLabel = self.raceWindow.addLabel(text=f"Heat {self.heatNumber}", row=0, column=0, sticky="W")
 
         # Headers - Ensure proper alignment
-        self.raceWindow.addLabel(text="Race #", row=0, column=0, sticky="W")
-        self.raceWindow.addLabel(text="Racer 1 - Lane", row=0, column=1, sticky="W")
-        self.raceWindow.addLabel(text="Racer 1 - Time", row=0, column=2, sticky="W")
-        self.raceWindow.addLabel(text="Racer 2 - Lane", row=0, column=3, sticky="W")
-        self.raceWindow.addLabel(text="Racer 2 - Time", row=0, column=4, sticky="W")
-
-        # Store input fields for later access
-        self.laneFields1 = []
-        self.timeFields1 = []
-        self.laneFields2 = []
-        self.timeFields2 = []
-
-        for i in range(10):  # 10 races (starting row = 1)
-            self.raceWindow.addLabel(text=f"Race {i + 1}:", row=i + 1, column=0, sticky="W")
-
-            lane1 = self.raceWindow.addTextField(text="", row=i + 1, column=1)
-            time1 = self.raceWindow.addTextField(text="", row=i + 1, column=2)
-            lane2 = self.raceWindow.addTextField(text="", row=i + 1, column=3)
-            time2 = self.raceWindow.addTextField(text="", row=i + 1, column=4)
-
-            self.laneFields1.append(lane1)
-            self.timeFields1.append(time1)
-            self.laneFields2.append(lane2)
-            self.timeFields2.append(time2)
+        self.raceWindow.addLabel(text="Car Number", row=1, column=1, sticky="W")
+        self.raceWindow.addLabel(text="Time", row=1, column=2, sticky="W")
+
+        # One car and time field per lane, reused for every heat
+        self.carFields = []
+        self.timeFields = []
+
+        for lane in range(self.lanes):  # One row per lane (starting row = 2)
+            self.raceWindow.addLabel(text=f"Lane {lane + 1}:", row=lane + 2, column=0, sticky="W")
+            self.carFields.append(self.raceWindow.addTextField(text="", row=lane + 2, column=1))
+            self.timeFields.append(self.raceWindow.addTextField(text="", row=lane + 2, column=2))
 
         # Buttons
-        self.raceWindow.addButton(text="Save Race Times", row=11, column=0, columnspan=5, command=self.saveRaceTime)
-        self.raceWindow.addButton(text="Analyze Race Results", row=12, column=0, columnspan=5, command=self.analyzeRaceResults)
+        button_row = self.lanes + 2
+        self.raceWindow.addButton(text="Save Heat", row=button_row, column=0, columnspan=3, command=self.saveRaceTime)
+        self.raceWindow.addButton(text="Analyze Race Results", row=button_row + 1, column=0, columnspan=3, command=self.analyzeRaceResults)
+        self.raceWindow.addButton(text="Export Race Data", row=button_row + 2, column=0, columnspan=3, command=self.exportRaceData)
+        self.raceWindow.addButton(text="Connect Timer", row=button_row + 3, column=0, columnspan=3, command=self.connectTimer)
+        self.raceWindow.addButton(text="Generate Schedule", row=button_row + 4, column=0, columnspan=3, command=self.generateSchedule)
+        self.raceWindow.addButton(text="Start Standings Server", row=button_row + 5, column=0, columnspan=3, command=self.startStandingsServer)
+        self.timerStatus = self.raceWindow.addLabel(text="Timer: not connected", row=button_row + 6, column=0, columnspan=3, sticky="W")
+        self.serverStatus = self.raceWindow.addLabel(text="Standings server: off", row=button_row + 7, column=0, columnspan=3, sticky="W")
+
+        # Every heat, run or scheduled; only the rows in view are read and drawn
+        columns = ["Heat"] + [f"Lane {lane + 1}" for lane in range(self.lanes)]
+        self.heatGrid = VirtualGrid(self.raceWindow, columns, self.heatRows, width=max(60, 480 // len(columns)))
+        self.heatGrid.grid(row=button_row + 8, column=0, columnspan=3, sticky="NSEW")
+        self.fillScheduledCars()
+        self.refreshHeatGrid()
+
+    def heatRows(self, first, count):
+        """Returns the heat grid rows first .. first + count - 1: the car and time on each lane, or the scheduled cars."""
+        heats = range(first + 1, first + count + 1)
+        recorded = self.store.heat_results(heats.start, heats.stop - 1)
+        rows = []
+        for heat in heats:
+            # Rows in the file (including other stations' lanes of the same heat) over the ones still being saved
+            lanes = {**self.enteredHeats.get(heat, {}), **recorded.get(heat, {})}
+            if lanes:
+                cells = [f"{lanes[lane][0]}: {lanes[lane][1]:.4f}" if lane in lanes else "" for lane in range(1, self.lanes + 1)]
+            else:
+                cells = ["" if car is None else f"{car}" for car in self.scheduledCars(heat)]
+            rows.append([f"{heat}"] + cells)
+        return rows
+
+    def scheduledCars(self, heat):
+        """Returns the scheduled car on each lane for heat, or empty lanes if the heat is not in the schedule."""
+        if self.schedule is not None and 0 <= heat - self.scheduleStart < len(self.schedule):
+            return self.schedule[heat - self.scheduleStart]
+        return [None] * self.lanes
+
+    def refreshHeatGrid(self):
+        """Shows every heat so far plus the rest of the schedule, with the current heat highlighted and in view."""
+        if self.heatGrid is None:
+            return
+        heats = self.heatNumber
+        if self.schedule is not None:
+            heats = max(heats, self.scheduleStart + len(self.schedule) - 1)
+        self.heatGrid.set_rows(heats, current=self.heatNumber - 1)
+
+    def connectTimer(self):
+        """Starts reading heat times from an electronic finish-line timer on a serial port, or replays a recorded timer file."""
+        port = self.prompterBox(title="Connect Timer", promptString="Serial port or timer file (e.g. COM3, /dev/ttyUSB0):").strip()
+        if not port:
+            return
+
+        self.disconnectTimer()
+        try:
+            source, follow = derby_timer.open_timer(port)
+        except Exception as e:
+            self.messageBox("Error", f"Failed to connect to timer: {e}")
+            return
+
+        # The reader thread parses the timer output; the main loop picks up finished heats
+        self.timerReader = derby_timer.TimerReader(source, follow)
+        self.timerReader.start()
+        self.timerStatus["text"] = f"Timer: {port}"
+        self.after(TIMER_POLL_MS, self.pollTimer, self.timerReader)
+
+    def disconnectTimer(self):
+        """Stops the timer reader thread, if one is running."""
+        if self.timerReader is not None:
+            self.timerReader.stop()
+            self.timerReader = None
+            self.timerStatus["text"] = "Timer: not connected"
+
+    def pollTimer(self, reader):
+        """Records any heats reader has finished, then checks again after TIMER_POLL_MS while it is still connected."""
+        if reader is not self.timerReader:
+            return  # Disconnected or replaced by a new connection, which polls on its own
+
+        while True:
+            try:
+                times = reader.results.get_nowait()
+            except queue.Empty:
+                break
+
+            # The reader puts None (end of replay) or the error that stopped it
+            if times is None or isinstance(times, Exception):
+                self.disconnectTimer()
+                if times is not None:
+                    self.messageBox("Error", f"Timer disconnected: {times}")
+                return
+            self.recordTimerHeat(times)
+
+        self.after(TIMER_POLL_MS, self.pollTimer, reader)
+
+    def recordTimerHeat(self, times):
+        """Fills in the timer's time for each lane that has a car and saves the heat."""
+        lanes = [lane for lane in times if lane <= self.lanes and self.carFields[lane - 1].getText().strip()]
+        if not lanes:
+            # Keep the times so staff can enter the car numbers and save by hand
+            for lane, time in times.items():
+                if lane <= self.lanes:
+                    self.timeFields[lane - 1].setText(f"{time:.4f}")
+            self.messageBox("Error", f"Heat {self.heatNumber} finished before car numbers were entered. Enter them and press Save Heat.")
+            return
+
+        for lane in lanes:
+            self.timeFields[lane - 1].setText(f"{times[lane]:.4f}")
+        self.saveRaceTime()
+
+    def refreshStandings(self):
+        """Shows the current running statistics in the results window, if it is open."""
+        if self.standingsArea is None:
+            return
+        self.standingsArea.config(state=NORMAL)
+        self.standingsArea.setText(self.standings.standings_text(self.racerNames))
+        self.standingsArea.config(state=DISABLED)
+
+    def startStandingsServer(self):
+        """Serves live standings to spectator displays (TVs, phones) on the local network."""
+        import derby_server
+
+        if self.standingsServer is not None:
+            self.messageBox("Info", f"The standings server is already running on port {self.standingsServer.port}.")
+            return
+
+        port_text = self.prompterBox(title="Standings Server", promptString="Port for spectator displays:", inputText="8080").strip()
+        try:
+            port = int(port_text)
+        except ValueError:
+            self.messageBox("Error", "Please enter a whole number for the port.")
+            return
+
+        try:
+            self.standingsServer = derby_server.StandingsServer(port=port)
+            self.standingsServer.start()
+        except Exception as e:
+            self.standingsServer = None
+            self.messageBox("Error", f"Failed to start the standings server: {e}")
+            return
+        self.serverStatus["text"] = f"Standings server: http://{socket.gethostname()}:{self.standingsServer.port}/"
+
+        # Start the running statistics from every heat saved so far, then keep them up to date as heats are saved
+        if self.standings is None:
+            self.reloadStandings()
+        else:
+            self.publishStandings()
+
+    def reloadStandings(self):
+        """Restarts the running statistics from the heats in the race data file, read in the background."""
+        import derby_analysis
+
+        # Heats saved from now on go straight into the new statistics; the read covers every heat queued before it
+        self.standings = derby_analysis.RaceStandings()
+
+        def load_standings(store):
+            seed = derby_analysis.RaceStandings()
+            seed.add_race_times(derby_analysis.clean_race_times(store.race_times()))
+            return seed
+
+        self.worker.submit(
+            load_standings,
+            on_done=self.mergeStandings,
+            on_error=lambda e: self.messageBox("Error", f"Failed to load standings: {e}")
+        )
+
+    def mergeStandings(self, seed):
+        """Adds the statistics of the heats saved before the running statistics were started."""
+        self.standings.merge(seed)
+        self.refreshStandings()
+        self.publishStandings()
+
+    def publishStandings(self, results=None):
+        """Sends the standings to the spectator displays: only what changed when given the results of one heat."""
+        if self.standingsServer is None:
+            return
+        import derby_server
+
+        snapshot = derby_server.standings_snapshot(self.standings, self.racerNames)
+        update = derby_server.standings_update(self.standings, self.racerNames, results) if results else None
+        self.standingsServer.publish(snapshot, update)
+
+    def closeResults(self):
+        """Closes the results window, if it is open."""
+        if self.standingsArea is not None:
+            self.resultsWindow.destroy()
+            self.standingsArea = None
 
-        
     def analyzeRaceResults(self):
         """Analyzes race results to determine fastest cars and average race times."""
-        file_path = r"C:\Users\Zeke\Documents\derby_car_program.xlsx"
+        import derby_analysis
 
-        if not os.path.exists(file_path):
+        if self.store is None:
             self.messageBox("Error", "Race results file not found.")
             return
 
+        # Heats saved from now on go straight into the running statistics; the
+        # background read covers every heat queued before it
+        seed_standings = self.standings is None
+        if seed_standings:
+            self.standings = derby_analysis.RaceStandings()
+
+        def load_results(store):
+            # Read racer details and race times, one row per car per heat per lane
+            racer_df = store.racer_details()
+            racer_names = derby_analysis.racer_names(racer_df)
+            df = derby_analysis.clean_race_times(store.race_times())
+            if df.empty:
+                return racer_names, None, None
+
+            # Fastest car per lane and per car/lane statistics in one grouped pass, then mods and weights
+            results_text = derby_analysis.results_text(df, racer_names, racer_df)
+
+            seed = None
+            if seed_standings:
+                seed = derby_analysis.RaceStandings()
+                seed.add_race_times(df)
+            return racer_names, results_text, seed
+
+        self.worker.submit(
+            load_results,
+            on_done=self.showRaceResults,
+            on_error=lambda e: self.messageBox("Error", f"Failed to analyze race results: {e}")
+        )
+
+    def showRaceResults(self, loaded):
+        """Displays the live standings and the race results table loaded by analyzeRaceResults."""
+        racer_names, results_text, seed = loaded
+        self.racerNames.update(racer_names)
+        if seed is not None:
+            self.standings.merge(seed)
+            self.publishStandings()
+
+        if results_text is None:
+            self.messageBox("Error", "No race times have been saved yet.")
+            return
+
+        # Display results
+        self.closeResults()
+        self.resultsWindow = EasyFrame(title="Race Results", width=1500, height=1500)
+        self.resultsWindow.addLabel(text="Live Standings", row=0, column=0, sticky="NSEW")
+        self.standingsArea = self.resultsWindow.addTextArea(text="", row=1, column=0, width=100, height=15)
+        self.refreshStandings()
+
+        self.resultsWindow.addLabel(text="Race Results", row=2, column=0, sticky="NSEW")
+        text_area = self.resultsWindow.addTextArea(text=results_text, row=3, column=0, width=100, height=30)
+        text_area.config(state=DISABLED)
+
+        self.resultsWindow.addButton(text="Close", row=4, column=0, command=self.closeResults)
+
+    def analyzeWorkbook(self):
+        """Analyzes an exported or archived event workbook chosen by the user."""
+        path = filedialog.askopenfilename(
+            filetypes=[("Excel Files", "*.xlsx")],
+            title="Choose an event workbook to analyze"
+        )
+        if not path:
+            return
+
+        import derby_analysis
+        from derby_workbook import WorkbookCache, read_event
+
+        if self.workbookCache is None:
+            self.workbookCache = WorkbookCache()
         try:
-            # Read racer details
-            racer_df = pd.read_excel(file_path, sheet_name="Racer Details", engine="openpyxl")
-            racer_dict = dict(zip(racer_df["Racer Number"].astype(str), racer_df["Racer Name"]))
-
-            # Assign racer names dynamically
-            self.racer1Name = racer_dict.get("1", "Racer 1")
-            self.racer2Name = racer_dict.get("2", "Racer 2")
-
-            # Read race times
-            df = pd.read_excel(file_path, sheet_name="Race Times", engine="openpyxl")
-            df.columns = df.columns.str.strip()
-
-            # Convert race times and lane numbers to numeric values
-            df["Racer 1 - Time"] = pd.to_numeric(df["Racer 1 - Time"], errors="coerce")
-            df["Racer 2 - Time"] = pd.to_numeric(df["Racer 2 - Time"], errors="coerce")
-            df["Racer 1 - Lane"] = pd.to_numeric(df["Racer 1 - Lane"], errors="coerce").astype("Int64")
-            df["Racer 2 - Lane"] = pd.to_numeric(df["Racer 2 - Lane"], errors="coerce").astype("Int64")
-
-            df.fillna(0, inplace=True)  # Replace NaN values with 0
-
-            # Find the fastest times and the corresponding racers
-            fastest_lane_1_time = df[df["Racer 1 - Lane"] == 1]["Racer 1 - Time"].min(skipna=True)
-            fastest_lane_2_time = df[df["Racer 2 - Lane"] == 2]["Racer 2 - Time"].min(skipna=True)
-
-            fastest_lane_1_racer = self.racer1Name if (df["Racer 1 - Time"] == fastest_lane_1_time).any() else self.racer2Name
-            fastest_lane_2_racer = self.racer2Name if (df["Racer 2 - Time"] == fastest_lane_2_time).any() else self.racer1Name
-
-            # Average times per racer per lane
-            avg_racer1_lane1 = df[df["Racer 1 - Lane"] == 1]["Racer 1 - Time"].mean(skipna=True)
-            avg_racer1_lane2 = df[df["Racer 1 - Lane"] == 2]["Racer 1 - Time"].mean(skipna=True)
-            avg_racer2_lane1 = df[df["Racer 2 - Lane"] == 1]["Racer 2 - Time"].mean(skipna=True)
-            avg_racer2_lane2 = df[df["Racer 2 - Lane"] == 2]["Racer 2 - Time"].mean(skipna=True)
-
-            # Overall averages per racer
-            avg_racer1 = df["Racer 1 - Time"].mean(skipna=True)
-            avg_racer2 = df["Racer 2 - Time"].mean(skipna=True)
-
-            # Format NaN values
-            def format_time(value):
-                return f"{value:.2f} seconds" if not pd.isna(value) else "0.00 seconds"
-
-            results_text = (
-                f"Fastest Car on Lane 1: {fastest_lane_1_racer}, {format_time(fastest_lane_1_time)}\n"
-                f"Fastest Car on Lane 2: {fastest_lane_2_racer}, {format_time(fastest_lane_2_time)}\n\n"
-                f"Average Race Time for {self.racer1Name} on Lane 1: {format_time(avg_racer1_lane1)}\n"
-                f"Average Race Time for {self.racer1Name} on Lane 2: {format_time(avg_racer1_lane2)}\n"
-                f"Average Race Time for {self.racer2Name} on Lane 1: {format_time(avg_racer2_lane1)}\n"
-                f"Average Race Time for {self.racer2Name} on Lane 2: {format_time(avg_racer2_lane2)}\n\n"
-                f"Overall Average Race Time for {self.racer1Name}: {format_time(avg_racer1)}\n"
-                f"Overall Average Race Time for {self.racer2Name}: {format_time(avg_racer2)}"
-            )
+            racer_df, df = read_event(path, self.workbookCache)
+            df = derby_analysis.clean_race_times(df)
+            if df.empty:
+                self.messageBox("Error", "The workbook has no race times.")
+                return
+
+            results_text = derby_analysis.results_text(df, derby_analysis.racer_names(racer_df), racer_df)
+            cache = self.workbookCache.stats()
 
             # Display results
-            results_window = EasyFrame(title="Race Results", width=1500, height=1500)
-            results_window.addLabel(text="Race Results", row=0, column=0, sticky="NSEW")
-            
-            text_area = results_window.addTextArea(text=results_text, row=1, column=0, width=70, height=20)
+            results_window = EasyFrame(title=f"Race Results - {os.path.basename(path)}", width=1500, height=1500)
+            results_window.addLabel(text=f"Race Results - {os.path.basename(path)}", row=0, column=0, sticky="NSEW")
+            text_area = results_window.addTextArea(text=results_text, row=1, column=0, width=100, height=30)
             text_area.config(state=DISABLED)
-
-            results_window.addButton(text="Close", row=2, column=0, command=results_window.destroy)
+            results_window.addLabel(text=f"Workbook cache: {cache['hits']} hits, {cache['misses']} misses", row=2, column=0, sticky="W")
+            results_window.addButton(text="Close", row=3, column=0, command=results_window.destroy)
 
         except Exception as e:
-            self.messageBox("Error", f"Failed to analyze race results: {e}")
+            self.messageBox("Error", f"Failed to analyze workbook: {e}")
 
 if __name__ == "__main__":
+    # Opt-in cProfile/tracemalloc capture of a real event, see derby_profile
+    derby_profile.start_from_environment()
     DerbyLapTracker().mainloop()
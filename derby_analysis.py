@@ -0,0 +1,227 @@
+import pandas as pd
+
+from derby_model import fit_lane_model, lane_model_text
+from derby_mods import ModIndex, car_weights, mod_effects_text, weight_effect_text
+
+# Statistics computed for every car/lane pair, with the headers shown in the results table
+STATISTICS = {
+    "min": "Fastest",
+    "mean": "Average",
+    "median": "Median",
+    "std": "Std Dev",
+    "count": "Heats",
+}
+
+
+def clean_race_times(df):
+    """Return the race times table with numeric times and lanes, dropping rows without a time."""
+    df = df.copy()
+    df["Time"] = pd.to_numeric(df["Time"], errors="coerce")
+    df["Lane"] = pd.to_numeric(df["Lane"], errors="coerce")
+    df["Car Number"] = pd.to_numeric(df["Car Number"], errors="coerce")
+    df = df.dropna(subset=["Time", "Lane", "Car Number"])
+    df["Lane"] = df["Lane"].astype(int)
+    df["Car Number"] = df["Car Number"].astype(int)
+    return df
+
+
+def summarize(df, by=("Car Number", "Lane")):
+    """Return fastest, average, median, standard deviation and heat count for every group in one grouped pass."""
+    table = df.groupby(list(by), sort=True)["Time"].agg(list(STATISTICS))
+    return table.rename(columns=STATISTICS)
+
+
+def fastest_by_lane(df):
+    """Return the fastest run on each lane, one row per lane."""
+    fastest = df.loc[df.groupby("Lane")["Time"].idxmin(), ["Lane", "Car Number", "Time"]]
+    return fastest.set_index("Lane")
+
+
+def results_table(df):
+    """Return the per car/lane statistics with an "All" lanes row for each car."""
+    by_lane = summarize(df)
+    by_car = summarize(df, by=("Car Number",))
+    by_car["Lane"] = "All"
+    by_car = by_car.set_index("Lane", append=True)
+
+    table = pd.concat([by_lane.rename(index=str, level="Lane"), by_car]).sort_index(level="Car Number", sort_remaining=False)
+    return table
+
+
+def format_time(value):
+    """Format a time in seconds, showing missing values as zero."""
+    return f"{value:.2f} seconds" if not pd.isna(value) else "0.00 seconds"
+
+
+def racer_names(racer_df):
+    """Return {car number: racer name} from a racer details table."""
+    if "Car Number" not in racer_df.columns:
+        return {}
+    car_numbers = pd.to_numeric(racer_df["Car Number"], errors="coerce")
+    return {int(car): name for car, name in zip(car_numbers, racer_df["Racer Name"]) if not pd.isna(car)}
+
+
+def racer_label(car_number, racer_names):
+    """Return the racer's name and car number for display."""
+    return f"{racer_names.get(car_number, 'Unknown racer')} (car {car_number})"
+
+
+def results_text(df, racer_names, racer_df=None):
+    """
+    Return the race results as text: the fastest car on each lane followed by the per car/lane statistics table
+    and the lane-corrected times. With the racer details, also compare cars by mod and by weight.
+    """
+    lines = []
+    fastest = fastest_by_lane(df)
+    for lane, car_number, time in zip(fastest.index, fastest["Car Number"], fastest["Time"]):
+        lines.append(f"Fastest Car on Lane {lane}: {racer_label(car_number, racer_names)}, {format_time(time)}")
+    lines.append("")
+
+    table = results_table(df)
+    table.index = table.index.set_levels([racer_label(car, racer_names) for car in table.index.levels[0]], level=0)
+    table.index = table.index.set_names("Racer", level=0)
+    table["Heats"] = table["Heats"].astype(int)
+    lines.append(table.to_string(float_format=lambda value: f"{value:.3f}"))
+    lines.append("")
+
+    # Car times with the lane bias taken out
+    cars, lanes = fit_lane_model(df)
+    lines.append(lane_model_text(cars, lanes, racer_names))
+
+    if racer_df is not None and not racer_df.empty:
+        corrected = cars["Corrected Time"]
+        lines.append("")
+        lines.append(mod_effects_text(ModIndex(racer_df).effects(corrected)))
+        lines.append(weight_effect_text(car_weights(racer_df), corrected))
+    return "\n".join(lines)
+
+
+class RunningStat:
+    """Count, mean, variance, fastest and slowest time of a stream of times, updated in O(1) per time with Welford's method."""
+
+    __slots__ = ("count", "mean", "m2", "minimum", "maximum")
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, minimum=float("inf"), maximum=float("-inf")):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2  # Sum of squared differences from the mean
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def add(self, time):
+        """Add one time to the statistics."""
+        self.count += 1
+        delta = time - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (time - self.mean)
+        self.minimum = min(self.minimum, time)
+        self.maximum = max(self.maximum, time)
+
+    def merge(self, other):
+        """Combine another RunningStat into this one, as if its times had been added here."""
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def total(self):
+        """Sum of all times added."""
+        return self.mean * self.count
+
+    @property
+    def std(self):
+        """Sample standard deviation, or NaN with fewer than two times."""
+        return (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else float("nan")
+
+
+class RaceStandings:
+    """Running statistics per car, per lane and per car/lane pair, updated as each heat result is saved."""
+
+    def __init__(self):
+        self.cars = {}
+        self.lanes = {}
+        self.car_lanes = {}
+        self.heats = 0
+
+    @staticmethod
+    def _stat(stats, key):
+        stat = stats.get(key)
+        if stat is None:
+            stat = stats[key] = RunningStat()
+        return stat
+
+    def add_result(self, car_number, lane, time):
+        """Add one car's time on one lane."""
+        self._stat(self.cars, car_number).add(time)
+        self._stat(self.lanes, lane).add(time)
+        self._stat(self.car_lanes, (car_number, lane)).add(time)
+
+    def add_heat(self, results):
+        """Add the results of one heat, given as dicts keyed by the "Race Times" headers."""
+        for result in results:
+            self.add_result(result["Car Number"], result["Lane"], result["Time"])
+        self.heats = max([self.heats] + [result["Heat"] for result in results])
+
+    def add_race_times(self, df):
+        """Add a whole cleaned race times table with one grouped aggregation per key."""
+        for stats, by in ((self.cars, ["Car Number"]), (self.lanes, ["Lane"]), (self.car_lanes, ["Car Number", "Lane"])):
+            grouped = df.groupby(by)["Time"]
+            table = grouped.agg(["count", "mean", "var", "min", "max"])
+            table["var"] = table["var"].fillna(0.0) * (table["count"] - 1)
+            for key, count, mean, m2, minimum, maximum in zip(table.index, *(table[col] for col in table.columns)):
+                self._stat(stats, key).merge(RunningStat(int(count), mean, m2, minimum, maximum))
+        if not df.empty:
+            self.heats = max(self.heats, int(df["Heat"].max()))
+
+    def merge(self, other):
+        """Combine the statistics of another RaceStandings into this one."""
+        for stats, other_stats in ((self.cars, other.cars), (self.lanes, other.lanes), (self.car_lanes, other.car_lanes)):
+            for key, stat in other_stats.items():
+                self._stat(stats, key).merge(stat)
+        self.heats = max(self.heats, other.heats)
+
+    def table(self, by="cars"):
+        """Return the statistics per "cars", "lanes" or "car_lanes" as a DataFrame, fastest average first."""
+        stats = getattr(self, by)
+        index_names = {"cars": ["Car Number"], "lanes": ["Lane"], "car_lanes": ["Car Number", "Lane"]}[by]
+        index = pd.MultiIndex.from_tuples(
+            [key if isinstance(key, tuple) else (key,) for key in stats], names=index_names
+        ) if stats else pd.MultiIndex.from_tuples([], names=index_names)
+        table = pd.DataFrame({
+            "Fastest": [stat.minimum for stat in stats.values()],
+            "Average": [stat.mean for stat in stats.values()],
+            "Slowest": [stat.maximum for stat in stats.values()],
+            "Std Dev": [stat.std for stat in stats.values()],
+            "Heats": [stat.count for stat in stats.values()],
+        }, index=index)
+        if len(index_names) == 1:
+            table.index = table.index.get_level_values(0)
+        return table.sort_values("Average", kind="stable")
+
+    def standings_text(self, racer_names):
+        """Return the current standings, fastest average first, with each lane's fastest car."""
+        lines = [f"Live standings after heat {self.heats}:"]
+        ranked = sorted(self.cars.items(), key=lambda item: item[1].mean)
+        for place, (car_number, stat) in enumerate(ranked, start=1):
+            lines.append(
+                f"{place:>3}. {racer_label(car_number, racer_names)}: average {stat.mean:.3f}, "
+                f"best {stat.minimum:.3f}, {stat.count} heats"
+            )
+        lines.append("")
+
+        for lane in sorted(self.lanes):
+            stat = self.lanes[lane]
+            fastest_car = min(
+                (car for car, car_lane in self.car_lanes if car_lane == lane),
+                key=lambda car: self.car_lanes[(car, lane)].minimum,
+            )
+            lines.append(
+                f"Lane {lane}: average {stat.mean:.3f}, fastest {racer_label(fastest_car, racer_names)} {stat.minimum:.3f}"
+            )
+        return "\n".join(lines)
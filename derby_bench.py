@@ -0,0 +1,591 @@
+"""
+Benchmarks for the race data hot paths, run with:
+
+    python derby_bench.py              every benchmark
+    python derby_bench.py gui_paths    only the named ones (the bench_ functions without the prefix)
+"""
+import asyncio
+import contextlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import derby_analysis
+import derby_formats
+import derby_journal
+import derby_model
+import derby_mods
+import derby_roster
+import derby_schedule
+import derby_server
+from derby_season import season_standings
+from derby_store import RaceStore
+from derby_workbook import WorkbookCache
+
+
+def synthetic_race_times(rows, cars=150, lanes=6, seed=0):
+    """Return a long-format race times table with about the given number of rows."""
+    rng = np.random.default_rng(seed)
+    heats = max(1, rows // lanes)
+    # A random starting car per heat and the others spread evenly after it, so no car runs twice in one heat
+    spacing = max(1, cars // lanes)
+    car_numbers = ((rng.integers(0, cars, size=heats)[:, None] + spacing * np.arange(lanes)) % cars + 1).ravel()
+    lane_bias = np.linspace(0.0, 0.05, lanes)
+    return pd.DataFrame({
+        "Heat": np.repeat(np.arange(1, heats + 1), lanes),
+        "Lane": np.tile(np.arange(1, lanes + 1), heats),
+        "Car Number": car_numbers,
+        "Time": 2.8 + car_numbers * 0.001 + np.tile(lane_bias, heats) + rng.normal(0, 0.03, heats * lanes),
+    })
+
+
+def timed(function, *args, repeat=5):
+    """Return the best wall time of function(*args) over repeat runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_analysis():
+    """Time the grouped car/lane summary as the number of heat rows grows."""
+    print("Race results analysis (car/lane summary)")
+    for rows in (1_000, 10_000, 100_000):
+        df = synthetic_race_times(rows)
+        print(f"  {rows:>7} rows: summarize {timed(derby_analysis.summarize, df) * 1000:8.2f} ms, "
+              f"results table {timed(derby_analysis.results_table, df) * 1000:8.2f} ms")
+
+
+def bench_standings(rows=100_000, lanes=6):
+    """Time one heat update of the running standings once rows results are already in them."""
+    df = synthetic_race_times(rows, lanes=lanes)
+    standings = derby_analysis.RaceStandings()
+    standings.add_race_times(df)
+    heat = df.tail(lanes).to_dict("records")
+
+    print("Live standings")
+    print(f"  seed from {rows} rows: {timed(derby_analysis.RaceStandings().add_race_times, df, repeat=1) * 1000:8.2f} ms")
+    print(f"  one heat update:      {timed(standings.add_heat, heat, repeat=100) * 1e6:8.2f} us")
+    print(f"  standings text:       {timed(standings.standings_text, {}) * 1000:8.2f} ms")
+
+
+def bench_workbook_cache(rows=10_000):
+    """Compare parsing an event workbook with reading it back from the workbook cache."""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "event.xlsx")
+        synthetic_race_times(rows).to_excel(path, sheet_name="Race Times", index=False)
+
+        cache = WorkbookCache()
+        miss = timed(cache.read_sheets, path, repeat=1)
+        hit = timed(cache.read_sheets, path)
+        print(f"Workbook cache ({rows} rows): miss {miss * 1000:8.2f} ms, hit {hit * 1000:8.2f} ms, {cache.stats()}")
+
+
+def bench_season(events=32, rows=2_000):
+    """Time season analysis of a folder of event workbooks with one process and with one process per core."""
+    with tempfile.TemporaryDirectory() as folder:
+        paths = []
+        for event in range(events):
+            path = os.path.join(folder, f"event{event:03}.xlsx")
+            synthetic_race_times(rows, seed=event).to_excel(path, sheet_name="Race Times", index=False)
+            paths.append(path)
+
+        cores = os.cpu_count() or 1
+        print(f"Season analysis ({events} workbooks of {rows} rows)")
+        for jobs in sorted({1, cores}):
+            print(f"  {jobs:>2} processes: {timed(season_standings, paths, jobs, repeat=1):8.2f} s")
+
+
+def synthetic_racers(cars=150):
+    """Return a racer details table for cars 1..cars."""
+    return pd.DataFrame({
+        "Racer Name": [f"Racer {car}" for car in range(1, cars + 1)],
+        "Boy Scout Rank": "Wolf",
+        "Car Name": [f"Car {car}" for car in range(1, cars + 1)],
+        "Car Number": np.arange(1, cars + 1),
+        "Car Weight": "5.0 oz",
+        "Mods": "[polished axles]",
+    })
+
+
+def bench_formats(rows=100_000):
+    """Compare size and write/read time of the export formats, checking that each one round-trips the data."""
+    racer_df = synthetic_racers()
+    df = synthetic_race_times(rows)
+    expected = derby_formats.typed_race_times(df)
+
+    print(f"Export formats ({rows} rows)")
+    with tempfile.TemporaryDirectory() as folder:
+        for extension in derby_formats.FORMATS:
+            path = os.path.join(folder, f"event{extension}")
+            write = timed(derby_formats.write_event, path, racer_df, df, repeat=1)
+            read = timed(derby_formats.read_event_file, path, repeat=1)
+            size = sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder) if name.endswith(extension))
+
+            # Round trip: the same heats, lanes and cars, and times to timer precision
+            racers_back, df_back = derby_formats.read_event_file(path)
+            df_back = derby_formats.typed_race_times(df_back)
+            pd.testing.assert_frame_equal(df_back, expected, check_dtype=False, atol=1e-4)
+            assert racers_back["Car Number"].tolist() == racer_df["Car Number"].tolist()
+
+            print(f"  {extension:<9} {size / 1024:9.1f} KB, write {write * 1000:9.2f} ms, read {read * 1000:9.2f} ms")
+
+
+def bench_schedule(lanes=6):
+    """Time heat chart generation as the pack grows and report its lane balance and opponent spread."""
+    print(f"Heat schedule ({lanes} lanes, 1 round)")
+    for cars in (10, 50, 150, 500, 999):
+        start = time.perf_counter()
+        heats = derby_schedule.generate_schedule(range(1, cars + 1), lanes)
+        elapsed = time.perf_counter() - start
+        quality = derby_schedule.schedule_quality(heats, lanes)
+        print(f"  {cars:>4} cars: {len(heats):>4} heats in {elapsed * 1000:7.2f} ms, lane spread {quality['lane_spread']}, "
+              f"opponents {quality['min_opponents']}-{quality['mean_opponents']:.1f}, max meetings {quality['max_meetings']}")
+
+
+def bench_lane_model():
+    """Time the car + lane model fit over a season's history as the number of cars grows."""
+    print("Lane-corrected car times (car + lane model)")
+    for cars, rows in ((150, 10_000), (1_000, 60_000), (5_000, 300_000)):
+        df = derby_analysis.clean_race_times(synthetic_race_times(rows, cars=cars))
+        print(f"  {cars:>5} cars, {rows:>7} rows: {timed(derby_model.fit_lane_model, df) * 1000:8.2f} ms")
+
+
+def bench_mods(cars=5_000, rows=300_000):
+    """Time building the mod index and comparing every mod, from the lane-corrected car times."""
+    mods = ["[polished axles]", "[canted wheels back/2.5 degree], [polished axles]", "[graphite]", "", "[rail rider], [3 wheel]"]
+    racer_df = synthetic_racers(cars)
+    racer_df["Mods"] = [mods[car % len(mods)] for car in range(cars)]
+    df = derby_analysis.clean_race_times(synthetic_race_times(rows, cars=cars))
+    cars_df, _ = derby_model.fit_lane_model(df)
+    corrected = cars_df["Corrected Time"]
+    index = derby_mods.ModIndex(racer_df)
+
+    print(f"Mod effectiveness ({cars} cars, {len(index.tags())} mods)")
+    print(f"  index build:  {timed(derby_mods.ModIndex, racer_df) * 1000:8.2f} ms")
+    print(f"  tag lookup:   {timed(index.cars_with, 'polished axles', repeat=1000) * 1e6:8.2f} us")
+    print(f"  all effects:  {timed(index.effects, corrected) * 1000:8.2f} ms")
+
+
+def bench_roster(racers=1_000):
+    """Time importing a roster: reading and validating the file, then one batch write against one write per racer."""
+    roster = synthetic_racers(racers)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "roster.csv")
+        roster.to_csv(path, index=False)
+
+        def validate():
+            return derby_roster.validate_roster(derby_roster.read_roster(path))
+
+        records = validate()[0].to_dict("records")
+
+        def write(batch):
+            store = RaceStore(os.path.join(folder, f"{time.perf_counter_ns()}.db"))
+            try:
+                if batch:
+                    store.add_racers(records)
+                else:
+                    for record in records:
+                        store.add_racer(record)
+            finally:
+                store.close()
+
+        print(f"Roster import ({racers} racers)")
+        print(f"  read + validate:      {timed(validate) * 1000:8.2f} ms")
+        print(f"  one batch write:      {timed(write, True) * 1000:8.2f} ms")
+        print(f"  one write per racer:  {timed(write, False, repeat=1) * 1000:8.2f} ms")
+
+
+def bench_heat_pages(lanes=6, page=12):
+    """Time reading one screen of the race entry heat grid as the number of recorded heats grows."""
+    print(f"Heat grid page ({page} heats)")
+    with tempfile.TemporaryDirectory() as folder:
+        for heats in (10, 10_000, 100_000):
+            df = synthetic_race_times(heats * lanes, cars=150, lanes=lanes)
+            store = RaceStore(os.path.join(folder, f"{heats}.db"))
+            try:
+                store.add_race_times(df.to_dict("records"))
+                middle = max(1, heats // 2)
+                elapsed = timed(store.heat_results, middle, middle + page - 1, repeat=100)
+            finally:
+                store.close()
+            print(f"  {heats:>7} heats: {elapsed * 1e6:8.2f} us")
+
+
+def bench_journal(heats=1_000, lanes=6):
+    """Time the fsync'd journal append per heat and recovering a journal of unsaved heats after a crash."""
+    df = synthetic_race_times(heats * lanes, cars=150, lanes=lanes)
+    entries = [(int(heat), f"entry-{heat}", group.to_dict("records")) for heat, group in df.groupby("Heat")]
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "event.db")
+        journal = derby_journal.HeatJournal(os.path.join(folder, "event.journal"), compact_heats=heats + 1)
+
+        start = time.perf_counter()
+        for heat, entry, results in entries[:200]:
+            journal.append(heat, entry, results)
+        append = (time.perf_counter() - start) / 200
+        for heat, entry, results in entries[200:]:
+            journal.append(heat, entry, results)
+
+        store = RaceStore(path)
+        try:
+            start = time.perf_counter()
+            journal.replay(store)
+            replay = time.perf_counter() - start
+        finally:
+            store.close()
+
+    print(f"Heat journal ({lanes} lanes)")
+    print(f"  append + fsync per heat:     {append * 1000:8.3f} ms")
+    print(f"  recover {heats} unsaved heats: {replay * 1000:8.2f} ms")
+
+
+async def _standings_swarm(server, clients, heats, requests, concurrency, cars=150, lanes=6):
+    """Connect the event stream clients, publish heats, then fetch snapshots; return the timings."""
+    standings = derby_analysis.RaceStandings()
+    racer_names = {car: f"Racer {car}" for car in range(1, cars + 1)}
+    df = synthetic_race_times((heats + 1) * lanes, cars=cars, lanes=lanes)
+    heat_results = [group.to_dict("records") for _, group in df.groupby("Heat")]
+    standings.add_heat(heat_results[0])
+    server.publish(derby_server.standings_snapshot(standings, racer_names))
+
+    # A client that falls behind gets a fresh snapshot instead of the missed updates, so wait for the last event id
+    last_version = server.version + heats
+
+    async def listen(ready, received):
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(b"GET /events HTTP/1.1\r\nHost: bench\r\n\r\n")
+        await reader.readuntil(b"event: snapshot")
+        ready.set_result(None)
+        version = 0
+        while version < last_version:
+            await reader.readuntil(b"id: ")
+            version = int(await reader.readuntil(b"\n"))
+        received.set_result(time.perf_counter())
+        writer.close()
+
+    loop = asyncio.get_running_loop()
+    ready = [loop.create_future() for _ in range(clients)]
+    received = [loop.create_future() for _ in range(clients)]
+    start = time.perf_counter()
+    listeners = [asyncio.ensure_future(listen(r, done)) for r, done in zip(ready, received)]
+    await asyncio.gather(*ready)
+    connected = time.perf_counter() - start
+
+    # One heat at a time, as saveRaceTime does: update the running statistics, encode once, push to every stream
+    start = time.perf_counter()
+    for results in heat_results[1:heats + 1]:
+        standings.add_heat(results)
+        server.publish(derby_server.standings_snapshot(standings, racer_names),
+                       derby_server.standings_update(standings, racer_names, results))
+        await asyncio.sleep(0)
+    published = time.perf_counter() - start
+    delivered = max(await asyncio.gather(*received)) - start
+    await asyncio.gather(*listeners)
+
+    async def fetch(count):
+        for _ in range(count):
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"GET /standings.json HTTP/1.1\r\nHost: bench\r\n\r\n")
+            await reader.read()
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(fetch(requests // concurrency) for _ in range(concurrency)))
+    fetched = time.perf_counter() - start
+    return connected, published, delivered, fetched
+
+
+def bench_standings_server(clients=500, heats=50, requests=2_000, concurrency=100):
+    """Load test the live standings server with a local swarm of event stream and snapshot clients."""
+    server = derby_server.StandingsServer("127.0.0.1", 0)
+    server.start()
+    try:
+        connected, published, delivered, fetched = asyncio.run(
+            _standings_swarm(server, clients, heats, requests, concurrency)
+        )
+    finally:
+        server.stop()
+
+    print(f"Standings server ({clients} event streams, {heats} heats; clients share this machine's CPU)")
+    print(f"  connect all streams:          {connected * 1000:8.2f} ms")
+    print(f"  publish per heat:             {published / heats * 1000:8.3f} ms")
+    print(f"  every update to every client: {delivered * 1000:8.2f} ms")
+    print(f"  snapshot requests:            {requests / fetched:8.0f} requests/s ({concurrency} concurrent)")
+
+
+class _Field:
+    """Stands in for a breezypythongui text field, text area or label."""
+
+    def __init__(self, text=""):
+        self.text = text
+
+    def getText(self):
+        return self.text
+
+    def setText(self, text):
+        self.text = text
+
+    def get(self, *args):
+        return self.text
+
+    def config(self, **options):
+        pass
+
+    def __setitem__(self, key, value):
+        pass
+
+
+class _Window:
+    """Stands in for the EasyFrame pop-up windows."""
+
+    def __init__(self, *args, **options):
+        pass
+
+    def addLabel(self, **options):
+        return _Field()
+
+    def addTextField(self, **options):
+        return _Field()
+
+    def addTextArea(self, text="", **options):
+        return _Field(text)
+
+    def addButton(self, **options):
+        return None
+
+    def destroy(self):
+        pass
+
+    def winfo_exists(self):
+        return True
+
+
+@contextlib.contextmanager
+def headless_tracker(path, lanes):
+    """
+    Yield a DerbyLapTracker with no Tk widgets: fields, message boxes and windows are stubbed out
+    and the file dialog always picks path. Its messages are collected in tracker.messages.
+    The GUI module is patched, and heat journals kept next to path, only inside the with block.
+    """
+    import Allmon_Ezekial_FinalProject as gui
+
+    saved = gui.EasyFrame, gui.filedialog.asksaveasfilename, os.environ.get(derby_journal.JOURNAL_DIR_ENV)
+    gui.EasyFrame = _Window
+    gui.filedialog.asksaveasfilename = lambda **options: path
+    os.environ[derby_journal.JOURNAL_DIR_ENV] = os.path.dirname(os.path.abspath(path))
+    try:
+        tracker = gui.DerbyLapTracker.__new__(gui.DerbyLapTracker)
+        tracker.initState()
+        tracker.messages = []
+        tracker.messageBox = lambda title, message: tracker.messages.append((title, message))
+        tracker.after = lambda milliseconds, callback, *args: None
+        tracker.addButton = lambda **options: None
+
+        # Widgets made by __init__, confirmAction and openRaceEntryScreen
+        tracker.saveStatus = _Field()
+        tracker.saveProgress = ttk_progress = _Field()
+        ttk_progress.start = ttk_progress.stop = lambda *args: None
+        tracker.racers, tracker.lanes = gui.MAX_RACERS, lanes
+        tracker.racerNameField, tracker.rankField, tracker.carNameField = _Field(), _Field(), _Field()
+        tracker.carNumberField, tracker.carWeightField, tracker.modsArea = _Field(), _Field(), _Field()
+        tracker.carFields = [_Field() for _ in range(lanes)]
+        tracker.timeFields = [_Field() for _ in range(lanes)]
+        tracker.heatLabel = _Field()
+        yield tracker
+    finally:
+        gui.EasyFrame, gui.filedialog.asksaveasfilename, journal_dir = saved
+        if journal_dir is None:
+            os.environ.pop(derby_journal.JOURNAL_DIR_ENV, None)
+        else:
+            os.environ[derby_journal.JOURNAL_DIR_ENV] = journal_dir
+
+
+def _drain(tracker):
+    """Wait until the background writer has finished everything queued and its callbacks have run."""
+    while tracker.worker.pending:
+        tracker.worker.poll()
+        time.sleep(0.0005)
+
+
+def _measure(operation):
+    """Return (wall time, peak traced memory) of operation(), run once untraced and once under tracemalloc."""
+    start = time.perf_counter()
+    operation()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        operation()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_gui_paths(sizes=(10, 1_000, 10_000, 100_000), cars=150, lanes=6, xlsx_heats=10_000):
+    """
+    Drive saveRacer, saveRaceTime and analyzeRaceResults headlessly against race data files of each size,
+    then time parsing the exported workbook with openpyxl. Times include the background write, as the operator
+    sees it once "All changes saved" shows. Exports above xlsx_heats are skipped: openpyxl needs minutes for them.
+    """
+    print(f"GUI save/analyze paths ({cars} cars, {lanes} lanes; wall time / peak traced memory)")
+    with tempfile.TemporaryDirectory() as folder:
+        for heats in sizes:
+            path = os.path.join(folder, f"{heats}.db")
+            store = RaceStore(path)
+            store.add_racers(synthetic_racers(cars).to_dict("records"))
+            store.add_race_times(synthetic_race_times(heats * lanes, cars=cars, lanes=lanes).to_dict("records"))
+            store.close()
+
+            with headless_tracker(path, lanes) as tracker:
+                tracker.openStore()
+                tracker.heatNumber = tracker.store.next_heat()
+                new_cars = iter(range(cars + 1, 1000))
+
+                def save_racer():
+                    car_number = next(new_cars)
+                    for field, text in ((tracker.racerNameField, f"Racer {car_number}"), (tracker.carNameField, f"Car {car_number}"),
+                                        (tracker.carNumberField, str(car_number)), (tracker.carWeightField, "5.0 oz")):
+                        field.setText(text)
+                    tracker.saveRacer()
+                    _drain(tracker)
+
+                def save_race_time():
+                    for lane in range(lanes):
+                        tracker.carFields[lane].setText(str(lane + 1))
+                        tracker.timeFields[lane].setText(f"{2.8 + lane * 0.01:.4f}")
+                    tracker.saveRaceTime()
+                    _drain(tracker)
+
+                def analyze():
+                    tracker.standings = None
+                    tracker.analyzeRaceResults()
+                    _drain(tracker)
+
+                results = [("saveRacer", _measure(save_racer)), ("saveRaceTime", _measure(save_race_time)),
+                           ("analyzeRaceResults", _measure(analyze))]
+
+                if heats <= xlsx_heats:
+                    workbook = os.path.join(folder, f"{heats}.xlsx")
+                    results.append(("export .xlsx", _measure(lambda: tracker.store.export(workbook))))
+                    results.append(("openpyxl parse", _measure(lambda: WorkbookCache().read_sheets(workbook))))
+
+                tracker.worker.close()
+                tracker.worker.join()
+                tracker.store.close()
+                errors = [message for title, message in tracker.messages if title == "Error"]
+                if errors:
+                    raise RuntimeError(f"{heats} heats: {errors[0]}")
+
+            print(f"  {heats:>7} heats")
+            for name, (elapsed, peak) in results:
+                print(f"    {name:<20} {elapsed * 1000:10.2f} ms {peak / 2**10:11,.0f} KiB")
+            if heats > xlsx_heats:
+                print(f"    {'export/parse .xlsx':<20} skipped above {xlsx_heats} heats")
+
+
+def bench_startup(runs=9):
+    """
+    Time a cold start of the GUI module in fresh interpreters: importing it and preparing the scaled logo,
+    and list the heavy libraries loaded by then. Creating the Tk window itself needs a display and is not included.
+    """
+    code = (
+        "import sys, time; start = time.perf_counter(); import Allmon_Ezekial_FinalProject as gui; gui.scaled_logo_path(); "
+        "print(time.perf_counter() - start, *[name for name in ('pandas', 'numpy', 'openpyxl', 'PIL') if name in sys.modules])"
+    )
+    folder = os.path.dirname(os.path.abspath(__file__))
+    times, loaded = [], set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", code], cwd=folder, capture_output=True, text=True, check=True).stdout.split()
+        times.append(float(output[0]))
+        loaded.update(output[1:])
+    print(f"GUI cold start ({runs} runs, import + logo)")
+    print(f"  median {np.median(times) * 1000:8.1f} ms, fastest {min(times) * 1000:8.1f} ms")
+    print(f"  heavy libraries loaded: {', '.join(sorted(loaded)) or 'none'}")
+
+
+def _station_writes(path, heats, seed, journal_mode):
+    """One entry station: save each heat in its own transaction, as the background writer does.
+    Returns (seconds, heats saved, heats renumbered because another station saved the number first)."""
+    store = RaceStore(path, journal_mode)
+    renumbered = 0
+    try:
+        start = time.perf_counter()
+        for results in heats:
+            heat = results[0]["Heat"]
+            times = [dict(result, **{"Time": result["Time"] + seed / 1000}) for result in results]
+            (saved,) = store.add_heats([(heat, f"station-{seed}-heat-{heat}", times)])
+            renumbered += saved != heat
+        return time.perf_counter() - start, len(heats), renumbered
+    finally:
+        store.close()
+
+
+def bench_multi_station(stations=4, heats=500, lanes=6, journal_modes=("delete", "wal")):
+    """
+    Time several entry stations (one process each) saving heats to one shared race data file in each journal mode,
+    then have every station enter the same heat numbers with different times and count the heats renumbered.
+    """
+    df = synthetic_race_times(heats * lanes, cars=150, lanes=lanes)
+    heat_results = [group.to_dict("records") for _, group in df.groupby("Heat")]
+    print(f"Shared race data file ({stations} stations, one transaction per heat)")
+    for journal_mode in journal_modes:
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "event.db")
+            RaceStore(path, journal_mode).close()
+            modes = [journal_mode] * stations
+
+            # Distinct heats per station: only lock contention
+            with ProcessPoolExecutor(max_workers=stations) as executor:
+                start = time.perf_counter()
+                runs = list(executor.map(_station_writes, [path] * stations,
+                                         [heat_results[i::stations] for i in range(stations)], [0] * stations, modes))
+                elapsed = time.perf_counter() - start
+
+                # The same new heat numbers from every station, each with its own times: one station keeps each
+                # number and the others' heats are saved under the next free ones
+                repeats = [[dict(result, Heat=result["Heat"] + heats) for result in results] for results in heat_results[:50]]
+                duplicates = list(executor.map(_station_writes, [path] * stations, [repeats] * stations,
+                                               range(1, stations + 1), modes))
+
+            store = RaceStore(path, journal_mode)
+            try:
+                (rows,) = store.conn.execute("SELECT COUNT(*) FROM race_times").fetchone()
+            finally:
+                store.close()
+
+        saved = sum(run[1] for run in runs)
+        renumbered = sum(run[2] for run in duplicates)
+        print(f"  {journal_mode} journal")
+        print(f"    {saved} heats saved in {elapsed * 1000:8.1f} ms: {saved / elapsed:8.0f} heats/s overall, "
+              f"{max(run[0] for run in runs) / (heats / stations) * 1000:.2f} ms per heat on the slowest station")
+        print(f"    {stations} stations entering the same {len(repeats)} heat numbers: {renumbered} heats renumbered, "
+              f"{rows - heats * lanes} rows saved "
+              f"(expected {stations * len(repeats) * lanes})")
+
+
+BENCHMARKS = [
+    bench_analysis, bench_standings, bench_workbook_cache, bench_formats, bench_season, bench_schedule,
+    bench_lane_model, bench_mods, bench_roster, bench_heat_pages, bench_journal, bench_standings_server,
+    bench_gui_paths, bench_startup, bench_multi_station,
+]
+
+
+if __name__ == "__main__":
+    chosen = sys.argv[1:]
+    unknown = set(chosen) - {bench.__name__[len("bench_"):] for bench in BENCHMARKS}
+    if unknown:
+        sys.exit(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+    for bench in BENCHMARKS:
+        if not chosen or bench.__name__[len("bench_"):] in chosen:
+            bench()
@@ -0,0 +1,129 @@
+"""
+Headless race results analysis for event workbooks (.xlsx), Parquet or Feather exports and race data files (.db),
+e.g. from a cron job:
+
+    python derby_cli.py events/ --export season_results.csv
+    python derby_cli.py events/ --season --jobs 8
+
+Nothing here imports tkinter, PIL or breezypythongui. pandas is only loaded once there is an event to analyze.
+"""
+import argparse
+import os
+import sys
+
+EVENT_EXTENSIONS = (".xlsx", ".parquet", ".feather", ".db")
+
+
+def event_paths(paths):
+    """Expand directories into the event files they contain, keeping the given order."""
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                # Skip Excel lock files and the racer details that go with a Parquet or Feather export
+                if name.lower().endswith(EVENT_EXTENSIONS) and not name.startswith("~$") and ".racers." not in name:
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def load_event(path, cache=None):
+    """Return (racer details, cleaned race times) from an event file in any supported format or a race data file."""
+    import derby_analysis
+    from derby_formats import read_event_file
+    from derby_store import read_archive
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found")
+
+    if path.lower().endswith(".db"):
+        # Read-only: analyzing an archive must never upgrade or otherwise change it
+        racer_df, df = read_archive(path)
+    else:
+        racer_df, df = read_event_file(path, cache)
+    return racer_df, derby_analysis.clean_race_times(df)
+
+
+def export_results(tables, export_path):
+    """Write the per car/lane results of every event to one .csv or .xlsx file, renamed into place when complete."""
+    import pandas as pd
+    from derby_files import replace_atomically, temp_path
+
+    table = pd.concat(tables, names=["Event"]).reset_index()
+    writing = temp_path(export_path)
+    try:
+        if export_path.lower().endswith(".xlsx"):
+            table.to_excel(writing, sheet_name="Race Results", index=False)
+        else:
+            table.to_csv(writing, index=False)
+        replace_atomically(writing, export_path)
+    finally:
+        if os.path.exists(writing):
+            os.remove(writing)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze Pinewood derby race results without the GUI.")
+    parser.add_argument("paths", nargs="+", help="event files (.xlsx, .parquet, .feather, .db) or folders of them")
+    parser.add_argument("--export", metavar="PATH", help="also write the per car/lane results table to a .csv or .xlsx file")
+    parser.add_argument("--quiet", action="store_true", help="do not print the results of each event")
+    parser.add_argument("--season", action="store_true", help="merge all events into season-wide per-car and per-lane statistics, lane-corrected times and mod comparison")
+    parser.add_argument("--jobs", type=int, default=None, help="processes to use with --season (default: one per core)")
+    args = parser.parse_args(argv)
+
+    if args.season:
+        return season_main(args)
+
+    import derby_analysis
+    from derby_workbook import WorkbookCache
+
+    cache = WorkbookCache()
+    tables = {}
+    status = 0
+    for path in event_paths(args.paths):
+        try:
+            racer_df, df = load_event(path, cache)
+            if df.empty:
+                print(f"{path}: no race times", file=sys.stderr)
+                continue
+
+            racer_names = derby_analysis.racer_names(racer_df)
+            if not args.quiet:
+                print(f"== {path} ==")
+                print(derby_analysis.results_text(df, racer_names, racer_df))
+                print()
+            tables[os.path.basename(path)] = derby_analysis.results_table(df)
+
+        except Exception as e:
+            print(f"{path}: failed to analyze race results: {e}", file=sys.stderr)
+            status = 1
+
+    if args.export and tables:
+        try:
+            export_results(tables, args.export)
+        except Exception as e:
+            print(f"Failed to export race results: {e}", file=sys.stderr)
+            status = 1
+    return status
+
+
+def season_main(args):
+    """Analyze every event in parallel and print or export the season-wide statistics."""
+    from derby_season import season_standings, season_text
+
+    season, racer_names, errors, history = season_standings(event_paths(args.paths), args.jobs)
+    for path, error in errors.items():
+        print(f"{path}: {error}", file=sys.stderr)
+
+    if not args.quiet:
+        print(season_text(season, racer_names, history))
+    if args.export:
+        try:
+            export_results({"Season": season.table("car_lanes")}, args.export)
+        except Exception as e:
+            print(f"Failed to export race results: {e}", file=sys.stderr)
+            return 1
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
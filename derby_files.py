@@ -0,0 +1,33 @@
+"""
+Crash-safe file writes shared by the exports, the command-line tool and the heat journal: write under a temporary
+name, flush it to disk, then rename it over the real file.
+"""
+import os
+
+
+def temp_path(path):
+    """Return a temporary file name next to path with the same extension, for writing before an atomic rename."""
+    base, extension = os.path.splitext(path)
+    return f"{base}.tmp-{os.getpid()}{extension}"
+
+
+def fsync_directory(path):
+    """Make a rename or new file in path's directory durable (a no-op where directories cannot be opened)."""
+    try:
+        descriptor = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def replace_atomically(temp_path, path):
+    """Flush temp_path to disk and rename it over path, so path is either the old file or the complete new one."""
+    with open(temp_path, "rb+") as temp_file:
+        os.fsync(temp_file.fileno())
+    os.replace(temp_path, path)
+    fsync_directory(path)
@@ -0,0 +1,121 @@
+"""
+Storage formats for exported event data, chosen by file extension:
+
+    .xlsx      Excel workbook with "Racer Details" and "Race Times" sheets
+    .parquet   Parquet, race times in the file itself and racer details in a ".racers.parquet" file next to it
+    .feather   Feather (Arrow IPC), laid out the same way as Parquet
+
+Parquet and Feather store typed columns (lane as int8, car number as int16, time as float32) and are read
+memory-mapped. They need pyarrow, which is only imported when one of those formats is used.
+"""
+import os
+
+import pandas as pd
+
+from derby_files import replace_atomically, temp_path
+from derby_store import RACER_COLUMNS, RACE_TIME_COLUMNS
+from derby_workbook import read_event
+
+COLUMNAR_FORMATS = (".parquet", ".feather")
+FORMATS = (".xlsx",) + COLUMNAR_FORMATS
+
+# Column types used in the columnar formats
+RACE_TIME_TYPES = {"Heat": "int32", "Lane": "int8", "Car Number": "int16", "Time": "float32"}
+RACER_TYPES = {"Car Number": "int16"}
+
+
+def file_format(path):
+    """Return the format extension of path, raising ValueError for unsupported files."""
+    extension = os.path.splitext(path.lower())[1]
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported file type {extension or path}; use one of {', '.join(FORMATS)}")
+    return extension
+
+
+def racers_path(path):
+    """Return the racer details file that goes with a columnar race times file."""
+    base, extension = os.path.splitext(path)
+    return f"{base}.racers{extension}"
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet and Feather files need pyarrow (pip install pyarrow)") from None
+    return pyarrow
+
+
+def typed_race_times(df):
+    """Return the race times with the compact column types, dropping rows without a time."""
+    df = df[list(RACE_TIME_COLUMNS)].apply(pd.to_numeric, errors="coerce").dropna()
+    return df.astype(RACE_TIME_TYPES).reset_index(drop=True)
+
+
+def typed_racers(racer_df):
+    """Return the racer details with a numeric car number and text for every other column."""
+    racer_df = racer_df.reindex(columns=list(RACER_COLUMNS))
+    car_numbers = pd.to_numeric(racer_df["Car Number"], errors="coerce")
+    racer_df = racer_df[car_numbers.notna()].copy()
+    for column in racer_df.columns:
+        if column in RACER_TYPES:
+            racer_df[column] = pd.to_numeric(racer_df[column]).astype(RACER_TYPES[column])
+        else:
+            racer_df[column] = racer_df[column].fillna("").astype(str)
+    return racer_df.reset_index(drop=True)
+
+
+def write_event(path, racer_df, df):
+    """
+    Write racer details and race times to path in the format given by its extension.
+    Each file is written under a temporary name and renamed into place, so a crash never leaves a half-written export.
+    """
+    extension = file_format(path)
+    if extension == ".xlsx":
+        writing = temp_path(path)
+        try:
+            with pd.ExcelWriter(writing, engine="openpyxl", mode="w") as writer:
+                racer_df.to_excel(writer, sheet_name="Racer Details", index=False)
+                df.to_excel(writer, sheet_name="Race Times", index=False)
+            replace_atomically(writing, path)
+        finally:
+            if os.path.exists(writing):
+                os.remove(writing)
+        return
+
+    pyarrow = _import_pyarrow()
+    for table_path, table in ((path, typed_race_times(df)), (racers_path(path), typed_racers(racer_df))):
+        arrow_table = pyarrow.Table.from_pandas(table, preserve_index=False)
+        writing = temp_path(table_path)
+        try:
+            if extension == ".parquet":
+                pyarrow.parquet.write_table(arrow_table, writing)
+            else:
+                pyarrow.feather.write_feather(arrow_table, writing)
+            replace_atomically(writing, table_path)
+        finally:
+            if os.path.exists(writing):
+                os.remove(writing)
+
+
+def read_event_file(path, cache=None):
+    """Return (racer details, race times) from an event file in any supported format."""
+    extension = file_format(path)
+    if extension == ".xlsx":
+        return read_event(path, cache)
+
+    pyarrow = _import_pyarrow()
+
+    def read_table(table_path):
+        if extension == ".parquet":
+            return pyarrow.parquet.read_table(table_path, memory_map=True).to_pandas()
+        return pyarrow.feather.read_table(table_path, memory_map=True).to_pandas()
+
+    df = read_table(path)
+    if os.path.exists(racers_path(path)):
+        racer_df = read_table(racers_path(path))
+    else:
+        racer_df = pd.DataFrame(columns=list(RACER_COLUMNS))
+    return racer_df, df
@@ -0,0 +1,97 @@
+"""
+A scrolling table for any number of rows that only ever creates enough Treeview items for the visible rows.
+
+Scrolling does not move items: the same items are refilled with the rows now in view, fetched a page at a time.
+Opening the table and scrolling it cost the same whether it holds ten heats or a hundred thousand.
+"""
+from tkinter import ttk
+
+# Visible rows when no height is given
+PAGE_ROWS = 12
+
+
+class VirtualGrid(ttk.Frame):
+    """
+    Table whose rows come from get_rows(first, count), a callable returning the value tuples of rows
+    first .. first + count - 1. Only the rows in view are ever fetched.
+    """
+
+    def __init__(self, master, columns, get_rows, row_count=0, height=PAGE_ROWS, width=90):
+        ttk.Frame.__init__(self, master)
+        self.get_rows = get_rows
+        self.row_count = row_count
+        self.height = height
+        self.first = 0
+        self.current = None  # Row shown highlighted, e.g. the heat being entered
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=height, selectmode="none")
+        for column in columns:
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=width, anchor="w", stretch=True)
+        self.tree.tag_configure("current", background="#fff2a8")
+        self.tree.grid(row=0, column=0, sticky="NSEW")
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar.grid(row=0, column=1, sticky="NS")
+        self.grid_columnconfigure(0, weight=1)
+
+        # The fixed pool of items, refilled on every scroll
+        self.items = [self.tree.insert("", "end", values=()) for _ in range(height)]
+
+        for widget in (self.tree, self.scrollbar):
+            widget.bind("<MouseWheel>", self._wheel)
+            widget.bind("<Button-4>", lambda event: self.scroll(-3))
+            widget.bind("<Button-5>", lambda event: self.scroll(3))
+        self.redraw()
+
+    def _wheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+
+    def yview(self, *args):
+        """Scrollbar callback: ("moveto", fraction) or ("scroll", amount, "units" or "pages")."""
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * self.row_count))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            self.scroll(amount * self.height if args[2] == "pages" else amount)
+
+    def scroll(self, rows):
+        """Move the view by rows (negative is up)."""
+        self.scroll_to(self.first + rows)
+
+    def scroll_to(self, first):
+        """Show rows starting at first, kept within the table."""
+        first = max(0, min(first, self.row_count - self.height))
+        if first != self.first:
+            self.first = first
+            self.redraw()
+
+    def see(self, row):
+        """Scroll just far enough that row is in view."""
+        if row < self.first:
+            self.scroll_to(row)
+        elif row >= self.first + self.height:
+            self.scroll_to(row - self.height + 1)
+
+    def set_rows(self, row_count, current=None):
+        """Change the number of rows and the highlighted row, keeping it in view, and redraw."""
+        self.row_count = row_count
+        self.current = current
+        self.first = max(0, min(self.first, row_count - self.height))
+        if current is not None:
+            self.see(current)
+        self.redraw()
+
+    def redraw(self):
+        """Refill the item pool with the rows in view."""
+        count = max(0, min(self.height, self.row_count - self.first))
+        rows = list(self.get_rows(self.first, count)) if count else []
+        for offset, item in enumerate(self.items):
+            row = self.first + offset
+            values = rows[offset] if offset < len(rows) else ()
+            self.tree.item(item, values=values, tags=("current",) if row == self.current else ())
+
+        if self.row_count > self.height:
+            self.scrollbar.set(self.first / self.row_count, (self.first + self.height) / self.row_count)
+        else:
+            self.scrollbar.set(0, 1)
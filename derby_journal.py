@@ -0,0 +1,146 @@
+"""
+Write-ahead journal of entered heats, kept on this computer's own disk.
+
+Each heat is appended as one JSON line and fsync'd before it is queued for the background writer, so a crash loses
+at most the heat being typed in. On startup every journaled heat is written to the race data file; heats it
+already has are skipped. Heats already in the file are dropped from the journal from time to time (compaction),
+so it stays small. Heats are matched by the entry id given to each heat when it is entered, never by heat number:
+the race data file renumbers a heat when another station saved the same heat number first.
+
+Every station keeps its own journal in a per-user folder on its local disk, not next to the race data file: the
+fsync on every heat then never waits on a network share, and a dropped share cannot lose the heat being saved.
+The file name carries a hash of the race data file's path and the station's name (DERBY_STATION, else the
+computer's name), because a journal is only ever read and rewritten by the one program that appends to it.
+"""
+import hashlib
+import json
+import os
+import re
+import socket
+import sys
+import threading
+
+from derby_files import fsync_directory, replace_atomically
+
+# Compact the journal after this many heats have been appended since the last compaction
+COMPACT_HEATS = 50
+
+
+# Name of this entry station, used in its journal file name; set it to run two stations on one computer
+STATION_ENV = "DERBY_STATION"
+
+# Folder for the journals instead of the per-user default; keep it on a local disk
+JOURNAL_DIR_ENV = "DERBY_JOURNAL_DIR"
+
+
+def station_name():
+    """Return this station's name: DERBY_STATION if set, else the computer's name."""
+    return os.environ.get(STATION_ENV, "").strip() or socket.gethostname()
+
+
+def journal_dir():
+    """Return the folder for journals: DERBY_JOURNAL_DIR if set, else a per-user data folder on this computer."""
+    folder = os.environ.get(JOURNAL_DIR_ENV, "").strip()
+    if folder:
+        return folder
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+        return os.path.join(base, "DerbyTracker", "journals")
+    if sys.platform == "darwin":
+        return os.path.join(os.path.expanduser("~"), "Library", "Application Support", "DerbyTracker", "journals")
+    base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "derby-tracker", "journals")
+
+
+def journal_path(store_path, station=None):
+    """
+    Return this station's (or the given station's) journal file for a race data file, in journal_dir().
+    Named after the race data file for people, and keyed by a hash of its full path and the station name.
+    """
+    key = f"{os.path.normcase(os.path.abspath(store_path))}\n{station or station_name()}"
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    name = re.sub(r"[^A-Za-z0-9_-]+", "_", os.path.splitext(os.path.basename(store_path))[0]).strip("_") or "race"
+    return os.path.join(journal_dir(), f"{name}-{digest}.journal")
+
+
+class HeatJournal:
+    """
+    Append-only journal of heat results, one JSON line per heat: {"heat": 12, "entry": "...", "results": [...]}.
+    Appends come from the main loop and compaction from the background writer, so both hold a lock.
+    """
+
+    def __init__(self, path, compact_heats=COMPACT_HEATS):
+        self.path = path
+        self.compact_heats = compact_heats
+        self.appended = 0  # Heats appended since the last compaction
+        self._lock = threading.Lock()
+
+    def append(self, heat, entry, results):
+        """Append one heat, with its entry id, and wait until it is on disk."""
+        line = json.dumps({"heat": heat, "entry": entry, "results": results}) + "\n"
+        with self._lock:
+            created = not os.path.exists(self.path)
+            if created:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as journal:
+                journal.write(line)
+                journal.flush()
+                os.fsync(journal.fileno())
+            if created:
+                fsync_directory(self.path)
+            self.appended += 1
+
+    def entries(self):
+        """Return the journaled heats in order. A torn last line from a crash mid-append is skipped."""
+        if not os.path.exists(self.path):
+            return []
+        entries = []
+        with open(self.path, encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and {"heat", "entry", "results"} <= entry.keys():
+                    entries.append(entry)
+        return entries
+
+    def replay(self, store):
+        """
+        Write every journaled heat that store does not have yet, then empty the journal.
+        Returns the heat numbers the recovered heats were saved under.
+        """
+        with self._lock:
+            missing = self._missing(store)
+            recovered = store.add_heats([(entry["heat"], entry["entry"], entry["results"]) for entry in missing]) if missing else []
+            self._rewrite([])
+        return sorted(recovered)
+
+    def needs_compaction(self):
+        """Return True once enough heats have been appended since the last compaction."""
+        return self.appended >= self.compact_heats
+
+    def compact(self, store):
+        """Drop the heats that store already has, keeping any not yet written."""
+        with self._lock:
+            self._rewrite(self._missing(store))
+
+    def _missing(self, store):
+        """Return the journaled heats that store does not have."""
+        entries = self.entries()
+        if not entries:
+            return []
+        saved = store.saved_entries(entry["entry"] for entry in entries)
+        return [entry for entry in entries if entry["entry"] not in saved]
+
+    def _rewrite(self, entries):
+        self.appended = 0
+        if not entries:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+                fsync_directory(self.path)
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as journal:
+            journal.writelines(json.dumps(entry) + "\n" for entry in entries)
+        replace_atomically(temp_path, self.path)
@@ -0,0 +1,87 @@
+"""
+Additive car + lane model of race times, fitted by least squares over every heat:
+
+    time = car effect + lane effect + noise
+
+The design matrix (one row per run, a 1 in the car's column and the lane's column) is never built. Its normal
+equations are assembled with bincount. The car block is diagonal, so it is eliminated exactly, leaving a
+lanes x lanes system. Lane effects come out summing to zero, so a car's effect is its expected time on an average
+lane: its lane-corrected time.
+"""
+import numpy as np
+import pandas as pd
+
+# Normal quantile for 95% confidence intervals
+Z_95 = 1.959964
+
+
+def fit_lane_model(df, z=Z_95):
+    """
+    Fit the car + lane model to a cleaned race times table.
+    Returns (cars, lanes): per car the lane-corrected time with its standard error and confidence interval,
+    and per lane its effect (seconds slower than the average lane) with its standard error.
+    """
+    car_index, car_numbers = pd.factorize(df["Car Number"], sort=True)
+    lane_index, lane_numbers = pd.factorize(df["Lane"], sort=True)
+    times = df["Time"].to_numpy(dtype=float)
+    car_count, lane_count = len(car_numbers), len(lane_numbers)
+
+    # Normal equations: car and lane run counts and time sums, and runs per car/lane pair
+    car_runs = np.bincount(car_index, minlength=car_count).astype(float)
+    car_sums = np.bincount(car_index, weights=times, minlength=car_count)
+    lane_runs = np.bincount(lane_index, minlength=lane_count).astype(float)
+    lane_sums = np.bincount(lane_index, weights=times, minlength=lane_count)
+    pair_runs = np.bincount(car_index * lane_count + lane_index, minlength=car_count * lane_count)
+    pair_runs = pair_runs.reshape(car_count, lane_count).astype(float)
+
+    # Eliminate the car effects: share of each car's runs on each lane
+    lane_shares = pair_runs / car_runs[:, None]
+    reduced = np.diag(lane_runs) - pair_runs.T @ lane_shares
+
+    # The reduced system has all-ones in its null space (a constant can move between car and lane effects).
+    # Adding scale * ones pins the lane effects to sum to zero without relying on rounding to find that direction;
+    # subtracting its inverse back out leaves the pseudo-inverse of the reduced system.
+    scale = lane_runs.mean() / lane_count
+    ones = np.ones((lane_count, lane_count))
+    reduced_inverse = np.linalg.pinv(reduced + scale * ones) - ones / (scale * lane_count ** 2)
+    lane_effects = reduced_inverse @ (lane_sums - lane_shares.T @ car_sums)
+    car_effects = (car_sums - pair_runs @ lane_effects) / car_runs
+
+    # Residual variance with one parameter per car and per lane, less the sum-to-zero constraint
+    residuals = times - car_effects[car_index] - lane_effects[lane_index]
+    degrees = len(times) - car_count - (lane_count - 1)
+    variance = residuals @ residuals / degrees if degrees > 0 else np.nan
+
+    car_errors = np.sqrt(variance * (1 / car_runs + np.einsum("ij,jk,ik->i", lane_shares, reduced_inverse, lane_shares)))
+    lane_errors = np.sqrt(variance * np.clip(np.diag(reduced_inverse), 0, None))
+
+    cars = pd.DataFrame({
+        "Corrected Time": car_effects,
+        "Std Error": car_errors,
+        "CI Low": car_effects - z * car_errors,
+        "CI High": car_effects + z * car_errors,
+        "Raw Average": car_sums / car_runs,
+        "Heats": car_runs.astype(int),
+    }, index=pd.Index(car_numbers, name="Car Number")).sort_values("Corrected Time", kind="stable")
+    lanes = pd.DataFrame({
+        "Lane Effect": lane_effects,
+        "Std Error": lane_errors,
+        "Heats": lane_runs.astype(int),
+    }, index=pd.Index(lane_numbers, name="Lane"))
+    return cars, lanes
+
+
+def lane_model_text(cars, lanes, racer_names):
+    """Return the lane-corrected standings and lane effects as text."""
+    from derby_analysis import racer_label
+
+    lines = ["Lane-corrected times (expected time on an average lane, 95% confidence interval):"]
+    for place, (car_number, row) in enumerate(cars.iterrows(), start=1):
+        lines.append(
+            f"{place:>3}. {racer_label(int(car_number), racer_names)}: {row['Corrected Time']:.3f} "
+            f"({row['CI Low']:.3f} - {row['CI High']:.3f}), raw average {row['Raw Average']:.3f}"
+        )
+    lines.append("")
+    for lane, row in lanes.iterrows():
+        lines.append(f"Lane {lane} bias: {row['Lane Effect']:+.3f} seconds (+/- {row['Std Error']:.3f})")
+    return "\n".join(lines)
@@ -0,0 +1,149 @@
+"""
+Car modifications ("Mods") and weights parsed from the free text entered at check-in.
+
+Mods are split into normalized tags, e.g. "[canted wheels back/2.5 degree], [polished axles]" becomes
+["canted wheels", "polished axles"]. An inverted index from tag to cars then answers "how much faster are
+cars with this mod" as a lookup instead of a text search through every racer.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+# Well-known mods, matched anywhere in a mod's text; anything else is kept as its own normalized tag
+MOD_TAGS = [
+    (re.compile(r"\bcant"), "canted wheels"),
+    (re.compile(r"polish\w*\s+axle|axles?\s+polish"), "polished axles"),
+    (re.compile(r"\bbent\s+axle"), "bent axles"),
+    (re.compile(r"rail\s*-?\s*rid"), "rail rider"),
+    (re.compile(r"\b(3|three)\s*-?\s*wheel|raised\s+wheel|lifted\s+wheel"), "3 wheels"),
+    (re.compile(r"graphite"), "graphite"),
+    (re.compile(r"tungsten"), "tungsten weight"),
+    (re.compile(r"extended\s+wheel\s*base"), "extended wheelbase"),
+]
+
+MOD_SEPARATORS = re.compile(r"[\[\],;\n]+")
+
+# Weight with an optional unit; a bare number is taken as ounces
+WEIGHT = re.compile(r"(\d+(?:\.\d*)?|\.\d+)\s*(oz|ounces?|g|grams?|lbs?|pounds?)?\b", re.IGNORECASE)
+OUNCES_PER_UNIT = {"oz": 1.0, "ounce": 1.0, "ounces": 1.0, "g": 1 / 28.349523, "gram": 1 / 28.349523,
+                   "grams": 1 / 28.349523, "lb": 16.0, "lbs": 16.0, "pound": 16.0, "pounds": 16.0}
+
+
+def parse_mods(text):
+    """Return the sorted, normalized mod tags in a free-text Mods entry."""
+    tags = set()
+    for part in MOD_SEPARATORS.split(str(text or "").lower()):
+        part = " ".join(part.strip(" .-").split())
+        if not part or part == "nan":
+            continue
+        known = {tag for pattern, tag in MOD_TAGS if pattern.search(part)}
+        tags.update(known or {part})
+    return sorted(tags)
+
+
+def parse_weight(text):
+    """Return a car weight in ounces, or NaN if the text has no number."""
+    match = WEIGHT.search(str(text or ""))
+    if match is None:
+        return float("nan")
+    unit = (match.group(2) or "oz").lower()
+    return float(match.group(1)) * OUNCES_PER_UNIT[unit]
+
+
+def parse_weights(values):
+    """Return a column of weight texts in ounces (NaN where there is no number), parsed in one vectorized pass."""
+    values = pd.Series(values, dtype=object).fillna("").astype(str)
+    parts = values.str.extract(WEIGHT.pattern, flags=re.IGNORECASE)
+    units = parts[1].fillna("oz").str.lower().map(OUNCES_PER_UNIT)
+    return pd.to_numeric(parts[0], errors="coerce") * units
+
+
+def car_weights(racer_df):
+    """Return each car's weight in ounces as a Series indexed by car number, leaving out unreadable weights."""
+    car_numbers = pd.to_numeric(racer_df["Car Number"], errors="coerce")
+    weights = pd.Series(parse_weights(racer_df["Car Weight"]).to_numpy(), index=car_numbers, dtype=float)
+    weights = weights[weights.index.notna() & weights.notna()]
+    weights.index = weights.index.astype(int)
+    return weights[~weights.index.duplicated(keep="last")]
+
+
+class ModIndex:
+    """Inverted index from mod tag to the car numbers that have it."""
+
+    def __init__(self, racer_df):
+        """Build the index from a racer details table with "Car Number" and "Mods" columns."""
+        car_numbers = pd.to_numeric(racer_df["Car Number"], errors="coerce")
+        cars = {}
+        for car_number, mods in zip(car_numbers, racer_df["Mods"]):
+            if pd.isna(car_number):
+                continue
+            for tag in parse_mods(mods):
+                cars.setdefault(tag, set()).add(int(car_number))
+        self.cars = {tag: np.array(sorted(numbers)) for tag, numbers in sorted(cars.items())}
+
+    def tags(self):
+        """Return every tag in the index."""
+        return list(self.cars)
+
+    def cars_with(self, tag):
+        """Return the car numbers with a mod tag (normalized the same way as the Mods text)."""
+        tags = parse_mods(tag)
+        if not tags:
+            return np.array([], dtype=int)
+        return self.cars.get(tags[0], np.array([], dtype=int))
+
+    def effects(self, car_times):
+        """
+        Compare cars with and without each mod.
+        car_times is a Series of one time per car (e.g. lane-corrected times) indexed by car number.
+        Returns one row per tag: cars and average time with the mod, without it, and the difference.
+        """
+        tags = self.tags()
+        car_numbers = car_times.index.to_numpy()
+        times = car_times.to_numpy(dtype=float)
+
+        # Tag x car incidence matrix, so every tag's sums come from one matrix product
+        has_mod = np.zeros((len(tags), len(car_numbers)), dtype=bool)
+        for row, tag in enumerate(tags):
+            has_mod[row] = np.isin(car_numbers, self.cars[tag])
+
+        with_count = has_mod.sum(axis=1)
+        without_count = len(car_numbers) - with_count
+        with_sum = has_mod @ times
+        without_sum = times.sum() - with_sum
+        with np.errstate(invalid="ignore", divide="ignore"):
+            with_mean = with_sum / with_count
+            without_mean = without_sum / without_count
+
+        effects = pd.DataFrame({
+            "Cars With": with_count,
+            "Average With": with_mean,
+            "Cars Without": without_count,
+            "Average Without": without_mean,
+            "Difference": with_mean - without_mean,
+        }, index=pd.Index(tags, name="Mod"))
+        return effects[effects["Cars With"] > 0].sort_values("Difference", kind="stable")
+
+
+def mod_effects_text(effects):
+    """Return the mod comparison as text, most helpful mod first."""
+    if effects.empty:
+        return "Mod effectiveness: no mods recorded."
+    lines = ["Mod effectiveness (lane-corrected average time, cars with the mod vs without):"]
+    for tag, row in effects.iterrows():
+        without = f"{row['Average Without']:.3f}" if row["Cars Without"] else "n/a"
+        lines.append(
+            f"  {tag}: {row['Average With']:.3f} with ({int(row['Cars With'])} cars) vs {without} without "
+            f"({int(row['Cars Without'])} cars), {row['Difference']:+.3f} seconds"
+        )
+    return "\n".join(lines)
+
+
+def weight_effect_text(weights, car_times):
+    """Return how much a car's time changes per ounce of weight, fitted over the cars with a known weight."""
+    weights = weights.reindex(car_times.index).dropna()
+    if len(weights) < 3 or weights.nunique() < 2:
+        return "Weight effect: not enough car weights recorded."
+    slope, _ = np.polyfit(weights.to_numpy(), car_times[weights.index].to_numpy(dtype=float), 1)
+    return f"Weight effect: {slope:+.3f} seconds per ounce ({len(weights)} cars, {weights.min():.2f} - {weights.max():.2f} oz)"
@@ -0,0 +1,72 @@
+"""
+Opt-in profiling of the GUI during a real event. Set DERBY_PROFILE to a file name prefix before starting it:
+
+    DERBY_PROFILE=spring_derby python Allmon_Ezekial_FinalProject.py
+
+When the program exits it writes:
+
+    spring_derby.prof         cProfile statistics of the Tk main loop (open with python -m pstats or snakeviz)
+    spring_derby.memory.txt   peak traced memory and the allocation sites holding the most memory (tracemalloc)
+
+Without DERBY_PROFILE nothing is imported or traced.
+"""
+import os
+
+PROFILE_ENV = "DERBY_PROFILE"
+
+# Stack frames kept per traced allocation, and allocation sites listed in the memory report
+MEMORY_FRAMES = 5
+MEMORY_TOP = 25
+
+
+class Profiler:
+    """cProfile of the calling thread plus tracemalloc of the whole process, written to files on stop()."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.profile = None
+
+    def start(self):
+        """Start profiling and tracing allocations."""
+        import cProfile
+        import tracemalloc
+
+        tracemalloc.start(MEMORY_FRAMES)
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        """Stop profiling and write the .prof and .memory.txt files. Returns their paths."""
+        import tracemalloc
+
+        if self.profile is None:
+            return []
+        self.profile.disable()
+        profile_path = f"{self.prefix}.prof"
+        self.profile.dump_stats(profile_path)
+        self.profile = None
+
+        memory_path = f"{self.prefix}.memory.txt"
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        with open(memory_path, "w", encoding="utf-8") as report:
+            report.write(f"Traced memory: {current / 2**20:.1f} MiB now, {peak / 2**20:.1f} MiB peak\n\n")
+            for stat in snapshot.statistics("traceback")[:MEMORY_TOP]:
+                report.write(f"{stat.size / 2**10:,.1f} KiB in {stat.count} blocks\n")
+                report.writelines(f"    {line}\n" for line in stat.traceback.format(most_recent_first=True))
+        return [profile_path, memory_path]
+
+
+def start_from_environment():
+    """Start a Profiler if DERBY_PROFILE is set, writing its files when the program exits. Returns it, or None."""
+    prefix = os.environ.get(PROFILE_ENV, "").strip()
+    if not prefix:
+        return None
+
+    import atexit
+
+    profiler = Profiler(prefix)
+    profiler.start()
+    atexit.register(profiler.stop)
+    return profiler
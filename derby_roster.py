@@ -0,0 +1,101 @@
+"""
+Bulk racer registration from a roster file: a .csv, or an .xlsx workbook (its "Racer Details" sheet, or the first
+sheet). Every row is checked in one vectorized pass, and nothing is imported unless the whole roster is valid.
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from derby_mods import parse_weights
+from derby_store import RACER_COLUMNS
+
+MAX_CAR_NUMBER = 999
+
+REQUIRED_COLUMNS = ["Racer Name", "Car Name", "Car Number", "Car Weight"]
+
+# Other column headers a roster may use, compared without case, spaces or punctuation
+HEADER_ALIASES = {
+    "name": "Racer Name",
+    "racer": "Racer Name",
+    "scout": "Racer Name",
+    "rank": "Boy Scout Rank",
+    "car": "Car Number",
+    "carno": "Car Number",
+    "number": "Car Number",
+    "weight": "Car Weight",
+    "modifications": "Mods",
+}
+
+
+def _header_key(header):
+    return re.sub(r"[^a-z0-9]", "", str(header).lower())
+
+
+def normalize_headers(roster):
+    """Rename roster columns to the "Racer Details" headers, matching case-insensitively and through HEADER_ALIASES."""
+    known = {_header_key(header): header for header in RACER_COLUMNS}
+    known.update(HEADER_ALIASES)
+    renamed = {}
+    for column in roster.columns:
+        header = known.get(_header_key(column))
+        if header is not None and header not in renamed.values():
+            renamed[column] = header
+    return roster.rename(columns=renamed)
+
+
+def read_roster(path, cache=None):
+    """Return the rows of a .csv or .xlsx roster as text, with the "Racer Details" headers where they can be matched."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        roster = pd.read_csv(path, dtype=str, keep_default_na=False, skipinitialspace=True)
+    elif extension == ".xlsx":
+        if cache is not None:
+            sheets = cache.read_sheets(path)
+        else:
+            sheets = pd.read_excel(path, sheet_name=None, engine="openpyxl", dtype=str)
+        if not sheets:
+            raise ValueError(f"{os.path.basename(path)} has no sheets")
+        roster = sheets.get("Racer Details", next(iter(sheets.values())))
+    else:
+        raise ValueError(f"Unsupported roster file type {extension or path}; use .csv or .xlsx")
+    return normalize_headers(roster)
+
+
+def validate_roster(roster, registered=()):
+    """
+    Check every roster row at once: required fields filled in, car number a whole number from 1 to 999,
+    car weight readable as a number, and car numbers unique within the roster and among the registered cars.
+    Returns (racers, errors): the racers with the "Racer Details" headers and a numeric car number,
+    and one message per problem, by spreadsheet row (the header is row 1).
+    """
+    missing = [header for header in REQUIRED_COLUMNS if header not in roster.columns]
+    if missing:
+        return None, [f"Missing column(s): {', '.join(missing)}"]
+
+    racers = roster.reindex(columns=list(RACER_COLUMNS)).fillna("").astype(str)
+    racers = racers.apply(lambda column: column.str.strip())
+
+    numbers = pd.to_numeric(racers["Car Number"], errors="coerce")
+    valid_number = numbers.notna() & (numbers % 1 == 0) & numbers.between(1, MAX_CAR_NUMBER)
+    weights = parse_weights(racers["Car Weight"])
+
+    checks = [(racers[header] == "", f"{header} is empty") for header in REQUIRED_COLUMNS]
+    checks += [
+        ((racers["Car Number"] != "") & ~valid_number, f"Car Number must be a whole number from 1 to {MAX_CAR_NUMBER}"),
+        ((racers["Car Weight"] != "") & weights.isna(), "Car Weight must be a number, e.g. 5.0 oz"),
+        (valid_number & numbers.duplicated(keep=False), "Car Number appears more than once in the roster"),
+        (valid_number & numbers.isin(list(registered)), "Car Number is already registered"),
+    ]
+
+    rows, messages = [], []
+    for failed, message in checks:
+        positions = np.flatnonzero(failed.to_numpy())
+        rows.extend(positions)
+        messages.extend([message] * len(positions))
+    order = np.argsort(rows, kind="stable")
+    errors = [f"Row {rows[i] + 2}: {messages[i]}" for i in order]
+
+    racers["Car Number"] = numbers.where(valid_number).astype("Int64")
+    return racers.reset_index(drop=True), errors
@@ -0,0 +1,95 @@
+"""
+Heat schedules (heat charts) for N cars on M lanes.
+
+Each round is a cyclic rotation: with the cars numbered 0..N-1, heat h puts car (h + offset[j]) mod N on lane j.
+Over the N heats of a round every car runs every lane exactly once. Opponents are spread by choosing offsets
+whose pairwise differences mod N are as distinct as possible: two cars d apart meet once for every two lanes
+whose offsets differ by d, so with distinct differences no two cars meet more than once per round
+(the "Partial Perfect-N" idea). Later rounds use a different set of offsets to meet new opponents.
+"""
+import numpy as np
+
+
+def choose_offsets(cars, lanes, used_differences=None):
+    """
+    Return lanes distinct offsets in 0..cars-1, chosen greedily so the differences between them repeat as little
+    as possible, including differences already used by earlier rounds. Ties go to the offset farthest from the
+    others, so a car's runs are spread out over the round instead of back to back.
+    """
+    counts = np.zeros(cars, dtype=np.int64) if used_differences is None else used_differences.copy()
+    offsets = [0]
+    candidates = np.arange(1, cars)
+    while len(offsets) < lanes:
+        chosen = np.array(offsets)
+        available = candidates[~np.isin(candidates, chosen)]
+
+        # Differences each candidate would add, both directions, one row per candidate
+        forward = (available[:, None] - chosen[None, :]) % cars
+        backward = (chosen[None, :] - available[:, None]) % cars
+        differences = np.sort(np.hstack([forward, backward]), axis=1)
+
+        # Repeats of differences already used, plus repeats among the candidate's own new differences
+        repeats = counts[differences].sum(axis=1) + (np.diff(differences, axis=1) == 0).sum(axis=1)
+        gap = np.minimum(forward, backward).min(axis=1)
+
+        best = np.lexsort((-gap, repeats))[0]
+        np.add.at(counts, differences[best], 1)
+        offsets.append(int(available[best]))
+    return offsets, counts
+
+
+def generate_schedule(car_numbers, lanes, rounds=1):
+    """
+    Return a heat chart: one list per heat with the car number on each lane, or None for an empty lane.
+    Every car runs each lane rounds times. With fewer cars than lanes the extra lanes are left empty.
+    """
+    car_numbers = list(car_numbers)
+    if not car_numbers or lanes < 1:
+        return []
+
+    # Pad small packs with byes so the rotation still covers every lane
+    slots = car_numbers + [None] * max(0, lanes - len(car_numbers))
+    cars = len(slots)
+
+    heats = []
+    used_differences = None
+    for _ in range(rounds):
+        offsets, used_differences = choose_offsets(cars, lanes, used_differences)
+        chart = (np.arange(cars)[:, None] + np.array(offsets)[None, :]) % cars
+        heats.extend([[slots[index] for index in heat] for heat in chart])
+
+    # Drop heats that would run with no cars at all
+    return [heat for heat in heats if any(car is not None for car in heat)]
+
+
+def schedule_quality(heats, lanes):
+    """
+    Return lane balance and opponent spread of a heat chart:
+    lane_spread  largest difference between how often a car runs its most and least used lane (0 is perfect)
+    min_opponents / mean_opponents  distinct opponents per car
+    max_meetings  most heats any two cars run together
+    """
+    cars = sorted({car for heat in heats for car in heat if car is not None})
+    if not cars:
+        return {"lane_spread": 0, "min_opponents": 0, "mean_opponents": 0.0, "max_meetings": 0}
+    index = {car: position for position, car in enumerate(cars)}
+    chart = np.array([[index[car] if car is not None else -1 for car in heat] for heat in heats])
+
+    lane_counts = np.zeros((len(cars), lanes), dtype=np.int64)
+    heat_rows, lane_columns = np.nonzero(chart >= 0)
+    np.add.at(lane_counts, (chart[heat_rows, lane_columns], lane_columns), 1)
+
+    meetings = np.zeros((len(cars), len(cars)), dtype=np.int64)
+    for first in range(lanes):
+        for second in range(lanes):
+            if first != second:
+                both = (chart[:, first] >= 0) & (chart[:, second] >= 0)
+                np.add.at(meetings, (chart[both, first], chart[both, second]), 1)
+
+    opponents = (meetings > 0).sum(axis=1)
+    return {
+        "lane_spread": int((lane_counts.max(axis=1) - lane_counts.min(axis=1)).max()),
+        "min_opponents": int(opponents.min()),
+        "mean_opponents": float(opponents.mean()),
+        "max_meetings": int(meetings.max()),
+    }
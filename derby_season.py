@@ -0,0 +1,112 @@
+"""
+Season-wide race statistics across many event files, with the per-event work spread over a process pool.
+
+Each process parses one event and reduces it to running statistics (count, mean, spread, fastest and slowest
+per car, lane and car/lane pair). Those partial aggregates are small and are merged exactly, so the season
+totals are the same as analyzing every heat at once. Cars are matched across events by car number.
+
+The lane-corrected times and the mod comparison need every run, not just the aggregates, so each process also
+returns its runs in compact columns and the racers' mods and weights. The car + lane model is fitted once over the
+whole season (so a pack racing on the same track all season gets one set of lane effects), and mods are compared
+through one ModIndex of the season's racers.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import derby_analysis
+from derby_cli import load_event
+
+# Columns kept from each event for the season-wide lane model and mod comparison
+RUN_TYPES = {"Car Number": "int16", "Lane": "int8", "Time": "float64"}
+RACER_HISTORY_COLUMNS = ["Car Number", "Car Weight", "Mods"]
+
+
+def event_standings(path):
+    """
+    Return (path, racer names, RaceStandings, (racer mods and weights, runs), error) for one event file.
+    Runs in a pool process.
+    """
+    try:
+        racer_df, df = load_event(path)
+        standings = derby_analysis.RaceStandings()
+        standings.add_race_times(df)
+        racers = racer_df.reindex(columns=RACER_HISTORY_COLUMNS)
+        runs = df[list(RUN_TYPES)].astype(RUN_TYPES)
+        return path, derby_analysis.racer_names(racer_df), standings, (racers, runs), None
+    except Exception as e:
+        return path, {}, None, None, f"failed to analyze race results: {e}"
+
+
+def merge_standings(results):
+    """
+    Merge event_standings results into (season RaceStandings, racer names, {path: error}, (racers, runs)).
+    A car's mods and weight are taken from the last event that lists it.
+    """
+    season = derby_analysis.RaceStandings()
+    names = {}
+    errors = {}
+    racers, runs = [], []
+    for path, racer_names, standings, history, error in results:
+        if error is not None:
+            errors[path] = error
+            continue
+        names.update(racer_names)
+        season.merge(standings)
+        racers.append(history[0])
+        runs.append(history[1])
+
+    racers = pd.concat(racers, ignore_index=True) if racers else pd.DataFrame(columns=RACER_HISTORY_COLUMNS)
+    car_numbers = pd.to_numeric(racers["Car Number"], errors="coerce")
+    racers = racers[car_numbers.notna()].assign(**{"Car Number": car_numbers.dropna().astype(int)})
+    racers = racers.drop_duplicates("Car Number", keep="last").reset_index(drop=True)
+    runs = pd.concat(runs, ignore_index=True) if runs else pd.DataFrame(columns=list(RUN_TYPES)).astype(RUN_TYPES)
+    return season, names, errors, (racers, runs)
+
+
+def season_standings(paths, jobs=None):
+    """
+    Analyze every event in paths and merge them into one RaceStandings.
+    Returns (standings, racer names, {path: error}, (racers, runs)): the racers' mods and weights and every
+    run of the season, for season_text. jobs is the number of processes (default: one per core);
+    with jobs=1 the events are analyzed in this process.
+    """
+    paths = list(paths)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(paths) < 2:
+        return merge_standings(map(event_standings, paths))
+
+    # Hand each process several files at a time to keep the pickling overhead low
+    chunksize = max(1, len(paths) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return merge_standings(executor.map(event_standings, paths, chunksize=chunksize))
+
+
+def season_text(season, racer_names, history=None):
+    """
+    Return the season standings per car and per lane as text. With the season history from season_standings,
+    also the season's lane-corrected times and the comparison of cars by mod and by weight.
+    """
+    from derby_mods import ModIndex, car_weights, mod_effects_text, weight_effect_text
+    from derby_model import fit_lane_model, lane_model_text
+
+    def format_table(table):
+        return table.to_string(float_format=lambda value: f"{value:.3f}")
+
+    cars = season.table("cars")
+    cars.insert(0, "Racer", [racer_names.get(car, "Unknown racer") for car in cars.index])
+    lines = [
+        f"Season standings ({len(cars)} cars):\n{format_table(cars)}",
+        "",
+        f"Lanes:\n{format_table(season.table('lanes'))}",
+    ]
+
+    if history is not None and not history[1].empty:
+        racers, runs = history
+        car_effects, lanes = fit_lane_model(runs)
+        lines += ["", lane_model_text(car_effects, lanes, racer_names)]
+        if not racers.empty:
+            corrected = car_effects["Corrected Time"]
+            lines += ["", mod_effects_text(ModIndex(racers).effects(corrected)), weight_effect_text(car_weights(racers), corrected)]
+    return "\n".join(lines)
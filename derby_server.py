@@ -0,0 +1,277 @@
+"""
+Live standings for hallway TVs and phones: a small HTTP server with Server-Sent Events, run on its own thread
+next to the GUI.
+
+    GET /                 page that shows the standings and keeps itself up to date
+    GET /standings.json   latest standings snapshot (with an ETag, so an unchanged snapshot costs a 304)
+    GET /events           event stream: a "snapshot" event on connect, then an "update" event for every saved heat
+
+Standings are encoded once per saved heat, when they are published, and the same bytes go to every client.
+Any number of viewers costs no more computation than one.
+"""
+import asyncio
+import json
+import math
+import threading
+
+from derby_analysis import racer_label
+
+# Comment line sent to idle event streams so proxies and browsers keep them open
+KEEPALIVE_SECONDS = 15
+
+# Updates buffered per event stream; a client that falls further behind is sent a fresh snapshot instead
+CLIENT_QUEUE = 32
+
+# Longest wait for a client to send its request
+REQUEST_TIMEOUT = 10
+
+
+def _stat_row(stat):
+    def number(value):
+        return None if math.isnan(value) or math.isinf(value) else round(value, 4)
+
+    return {
+        "heats": stat.count,
+        "average": number(stat.mean),
+        "fastest": number(stat.minimum),
+        "slowest": number(stat.maximum),
+        "std": number(stat.std),
+    }
+
+
+def car_row(standings, car_number, racer_names):
+    """Return one car's standings as a JSON-ready dict."""
+    return dict(car=car_number, racer=racer_label(car_number, racer_names), **_stat_row(standings.cars[car_number]))
+
+
+def lane_row(standings, lane):
+    """Return one lane's statistics as a JSON-ready dict."""
+    return dict(lane=lane, **_stat_row(standings.lanes[lane]))
+
+
+def standings_snapshot(standings, racer_names):
+    """Return the full standings, fastest average first, as a JSON-ready dict."""
+    ranked = sorted(standings.cars, key=lambda car: standings.cars[car].mean)
+    return {
+        "heat": standings.heats,
+        "cars": [car_row(standings, car, racer_names) for car in ranked],
+        "lanes": [lane_row(standings, lane) for lane in sorted(standings.lanes)],
+    }
+
+
+def standings_update(standings, racer_names, results):
+    """Return only the cars and lanes changed by one heat's results, as a JSON-ready dict."""
+    cars = sorted({result["Car Number"] for result in results})
+    lanes = sorted({result["Lane"] for result in results})
+    return {
+        "heat": standings.heats,
+        "cars": [car_row(standings, car, racer_names) for car in cars],
+        "lanes": [lane_row(standings, lane) for lane in lanes],
+    }
+
+
+def _event(name, version, data):
+    return f"event: {name}\nid: {version}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+def _response(status, content_type, body=b"", headers=()):
+    head = [f"HTTP/1.1 {status}", f"Content-Type: {content_type}", f"Content-Length: {len(body)}",
+            "Connection: close", "Access-Control-Allow-Origin: *", *headers]
+    return ("\r\n".join(head) + "\r\n\r\n").encode() + body
+
+
+class StandingsServer:
+    """
+    Serves the latest published standings over HTTP from an asyncio loop on a background thread.
+    publish() is called from the main loop; everything else runs on the server thread.
+    """
+
+    def __init__(self, host="0.0.0.0", port=8080):
+        self.host = host
+        self.port = port
+        self.version = 0
+        self.clients = 0  # Open event streams
+        self._snapshot = self._encode({"heat": 0, "cars": [], "lanes": []})
+        self._streams = set()
+        self._writers = set()
+        self._tasks = set()
+        self._loop = None
+        self._stopping = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+
+    def _encode(self, snapshot):
+        body = json.dumps(dict(snapshot, version=self.version), separators=(",", ":")).encode()
+        return self.version, body, _event("snapshot", self.version, snapshot)
+
+    def start(self):
+        """Start serving; raises OSError if the port cannot be opened. With port 0 a free port is picked."""
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._serve()), name="StandingsServer", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    def stop(self):
+        """Close every connection and stop the server thread."""
+        if self._loop is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._stopping.set)
+            self._thread.join()
+
+    def publish(self, snapshot, update=None):
+        """
+        Make snapshot the current standings and push it to every event stream:
+        as the smaller update (only what changed) if given, otherwise whole.
+        """
+        self.version += 1
+        encoded = self._encode(snapshot)
+        event = _event("update", self.version, update) if update is not None else encoded[2]
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._broadcast, encoded, event)
+
+    def _broadcast(self, encoded, event):
+        self._snapshot = encoded
+        for stream in self._streams:
+            if stream.full():
+                # Too far behind for updates to catch up; start it over from the current snapshot
+                while not stream.empty():
+                    stream.get_nowait()
+                stream.put_nowait(encoded[2])
+            else:
+                stream.put_nowait(event)
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        try:
+            server = await asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+        except OSError as e:
+            self._error = e
+            self._ready.set()
+            return
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+
+        async with server:
+            await self._stopping.wait()
+            server.close()
+
+            # End every event stream and let the open requests finish before the loop closes
+            for stream in self._streams:
+                while not stream.empty():
+                    stream.get_nowait()
+                stream.put_nowait(None)
+            for writer in list(self._writers):
+                writer.close()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._loop = None
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        self._writers.add(writer)
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), REQUEST_TIMEOUT)
+            lines = request.decode("latin-1").split("\r\n")
+            method, target = lines[0].split(" ")[:2]
+            headers = {name.strip().lower(): value.strip() for name, _, value in (line.partition(":") for line in lines[1:] if line)}
+            path = target.split("?", 1)[0]
+
+            if method != "GET":
+                writer.write(_response("405 Method Not Allowed", "text/plain", b"GET only\n", ["Allow: GET"]))
+            elif path == "/events":
+                await self._stream(reader, writer)
+            elif path == "/standings.json":
+                version, body, _ = self._snapshot
+                etag = f'"{version}"'
+                if headers.get("if-none-match") == etag:
+                    writer.write(_response("304 Not Modified", "application/json", headers=[f"ETag: {etag}"]))
+                else:
+                    writer.write(_response("200 OK", "application/json", body, [f"ETag: {etag}", "Cache-Control: no-cache"]))
+            elif path == "/":
+                writer.write(_response("200 OK", "text/html; charset=utf-8", PAGE))
+            else:
+                writer.write(_response("404 Not Found", "text/plain", b"Not found\n"))
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._tasks.discard(task)
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _stream(self, reader, writer):
+        """Send the current snapshot, then every update until the client goes away or the server stops."""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     b"Access-Control-Allow-Origin: *\r\n\r\n")
+        writer.write(self._snapshot[2])
+        stream = asyncio.Queue(CLIENT_QUEUE)
+        self._streams.add(stream)
+        self.clients += 1
+
+        # Clients send nothing after the request, so a finished read means they disconnected
+        closed = asyncio.ensure_future(reader.read())
+        try:
+            while True:
+                await writer.drain()
+                waiting = asyncio.ensure_future(stream.get())
+                done, _ = await asyncio.wait({waiting, closed}, timeout=KEEPALIVE_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+                if waiting not in done:
+                    waiting.cancel()
+                    if closed in done:
+                        break
+                    writer.write(b": keepalive\n\n")
+                    continue
+                event = waiting.result()
+                if event is None:
+                    break
+                writer.write(event)
+        finally:
+            closed.cancel()
+            self._streams.discard(stream)
+            self.clients -= 1
+
+
+PAGE = b"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Pinewood Derby Standings</title>
+<style>
+body { font-family: sans-serif; margin: 1em; background: #10233f; color: #fff; }
+table { border-collapse: collapse; width: 100%; font-size: 1.4em; }
+th, td { padding: 0.3em 0.6em; text-align: left; border-bottom: 1px solid #34507a; }
+th { color: #ffd24a; }
+</style></head>
+<body>
+<h1>Pinewood Derby Standings <span id="heat"></span></h1>
+<table><thead><tr><th>#</th><th>Racer</th><th>Average</th><th>Best</th><th>Heats</th></tr></thead><tbody id="cars"></tbody></table>
+<h2>Lanes</h2>
+<table><thead><tr><th>Lane</th><th>Average</th><th>Fastest</th><th>Heats</th></tr></thead><tbody id="lanes"></tbody></table>
+<script>
+var cars = {}, lanes = {};
+function fmt(value) { return value === null ? "" : value.toFixed(3); }
+function cell(text) { var td = document.createElement("td"); td.textContent = text; return td; }
+function row(cells) { var tr = document.createElement("tr"); cells.forEach(function (c) { tr.appendChild(cell(c)); }); return tr; }
+function render(heat) {
+  document.getElementById("heat").textContent = heat ? "after heat " + heat : "";
+  var body = document.getElementById("cars"); body.textContent = "";
+  Object.values(cars).sort(function (a, b) { return a.average - b.average; }).forEach(function (car, i) {
+    body.appendChild(row([i + 1, car.racer, fmt(car.average), fmt(car.fastest), car.heats]));
+  });
+  body = document.getElementById("lanes"); body.textContent = "";
+  Object.values(lanes).sort(function (a, b) { return a.lane - b.lane; }).forEach(function (lane) {
+    body.appendChild(row([lane.lane, fmt(lane.average), fmt(lane.fastest), lane.heats]));
+  });
+}
+function apply(data, replace) {
+  if (replace) { cars = {}; lanes = {}; }
+  data.cars.forEach(function (car) { cars[car.car] = car; });
+  data.lanes.forEach(function (lane) { lanes[lane.lane] = lane; });
+  render(data.heat);
+}
+var events = new EventSource("/events");
+events.addEventListener("snapshot", function (e) { apply(JSON.parse(e.data), true); });
+events.addEventListener("update", function (e) { apply(JSON.parse(e.data), false); });
+</script>
+</body></html>
+"""
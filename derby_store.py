@@ -0,0 +1,292 @@
+import os
+import sqlite3
+
+# Spreadsheet headers mapped to the database columns that store them
+RACER_COLUMNS = {
+    "Racer Name": "racer_name",
+    "Boy Scout Rank": "rank",
+    "Car Name": "car_name",
+    "Car Number": "car_number",
+    "Car Weight": "car_weight",
+    "Mods": "mods",
+}
+
+# One row per car per heat per lane
+RACE_TIME_COLUMNS = {
+    "Heat": "heat",
+    "Lane": "lane",
+    "Car Number": "car_number",
+    "Time": "time",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS racer_details (
+    id INTEGER PRIMARY KEY,
+    racer_name TEXT,
+    rank TEXT,
+    car_name TEXT,
+    car_number INTEGER,
+    car_weight TEXT,
+    mods TEXT
+);
+CREATE TABLE IF NOT EXISTS race_times (
+    id INTEGER PRIMARY KEY,
+    heat INTEGER,
+    lane INTEGER,
+    car_number INTEGER,
+    time REAL,
+    entry TEXT
+);
+CREATE INDEX IF NOT EXISTS race_times_heat ON race_times (heat);
+"""
+
+# Files saved before heats had entry ids get the column on open; the index comes after it
+ENTRY_COLUMN = "ALTER TABLE race_times ADD COLUMN entry TEXT"
+ENTRY_INDEX = "CREATE INDEX IF NOT EXISTS race_times_entry ON race_times (entry)"
+
+# One car per lane and one lane per car in each heat, and one racer per car number. Kept out of SCHEMA because
+# files saved before these rules may break them; such files still get the same checks on every insert.
+UNIQUE_INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS race_times_heat_lane ON race_times (heat, lane)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS race_times_heat_car ON race_times (heat, car_number)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS racer_details_car ON racer_details (car_number)",
+]
+
+# Insert a row only if no other row claims its lane or car in that heat, or its car number
+INSERT_RACE_TIME = """
+INSERT INTO race_times (heat, lane, car_number, time)
+SELECT ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM race_times WHERE heat = ? AND (lane = ? OR car_number = ?))
+"""
+INSERT_HEAT = "INSERT INTO race_times (heat, lane, car_number, time, entry) VALUES (?, ?, ?, ?, ?)"
+INSERT_RACER = """
+INSERT INTO racer_details ({names})
+SELECT {marks} WHERE NOT EXISTS (SELECT 1 FROM racer_details WHERE car_number = ?)
+"""
+
+# Stations sharing one file wait this long for each other's writes before giving up
+BUSY_TIMEOUT = 10.0
+
+# SQLite journal mode, from DERBY_JOURNAL_MODE. The default rollback journal ("delete") is safe with the file on a
+# network share. "wal" lets readers and the writer work at the same time and writes faster, but SQLite keeps its
+# index in shared memory, so only use it when every station runs on the computer that holds the file.
+# A file stays in WAL mode while any station has it open that way; set the same mode on every station.
+JOURNAL_MODE_ENV = "DERBY_JOURNAL_MODE"
+DEFAULT_JOURNAL_MODE = "delete"
+JOURNAL_MODES = ("wal", "delete", "truncate", "persist")
+
+
+def _read(conn, table, columns):
+    """Return table as a DataFrame with the spreadsheet headers as column names."""
+    import pandas as pd
+
+    names = ", ".join(columns.values())
+    cursor = conn.execute(f"SELECT {names} FROM {table} ORDER BY id")
+    return pd.DataFrame(cursor.fetchall(), columns=list(columns))
+
+
+def read_archive(path):
+    """
+    Return (racer details, race times) from a race data file opened read-only, for analysis of archived events.
+    Unlike RaceStore it never changes the file (no journal mode, schema or upgrade), so archives on read-only
+    media can be read too.
+    """
+    import pathlib
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found")
+    conn = sqlite3.connect(f"{pathlib.Path(path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        return _read(conn, "racer_details", RACER_COLUMNS), _read(conn, "race_times", RACE_TIME_COLUMNS)
+    finally:
+        conn.close()
+
+
+class StoreConflict(Exception):
+    """
+    Rows another station already saved differently; every other row of the same save was written.
+    conflicts holds one message per rejected row, and rows the rejected row dicts themselves.
+    """
+
+    def __init__(self, conflicts, rows=()):
+        Exception.__init__(self, "\n".join(conflicts))
+        self.conflicts = list(conflicts)
+        self.rows = list(rows)
+
+
+class RaceStore:
+    """
+    Stores racer details and race times in a SQLite file.
+    Saving only inserts the new rows, so a save costs the same no matter how many races are already recorded.
+    Several stations can share one file: each row is checked against the rows already saved as it is inserted,
+    and heats entered at a station are numbered as they are saved, so stations never overwrite each other. The Excel workbook (or a Parquet or Feather file) is produced on demand
+    with export.
+    """
+
+    def __init__(self, path, journal_mode=None):
+        """
+        Open (or create) the race data file at path. journal_mode defaults to DERBY_JOURNAL_MODE, else "delete".
+        The mode in use ends up in journal_mode and the one asked for in requested_journal_mode; they differ when
+        another station holds the file open in WAL mode, which SQLite will not switch away from while it is in use.
+        """
+        self.path = path
+        journal_mode = (journal_mode or os.environ.get(JOURNAL_MODE_ENV) or DEFAULT_JOURNAL_MODE).lower()
+        if journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"Unsupported journal mode {journal_mode}; use one of {', '.join(JOURNAL_MODES)}")
+        self.requested_journal_mode = journal_mode
+
+        self.conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+        try:
+            (self.journal_mode,) = self.conn.execute(f"PRAGMA journal_mode = {journal_mode}").fetchone()
+        except sqlite3.OperationalError:
+            # "database is locked" straight away, without waiting: keep the mode the other stations use
+            (self.journal_mode,) = self.conn.execute("PRAGMA journal_mode").fetchone()
+        self.conn.executescript(SCHEMA)
+        self._add_entry_column()
+        for index in UNIQUE_INDEXES:
+            try:
+                with self.conn:
+                    self.conn.execute(index)
+            except sqlite3.IntegrityError:
+                pass  # Older file with duplicates; add_racers and add_race_times still refuse new ones
+
+    def _add_entry_column(self):
+        """Add the entry id column to a file saved before it existed. Checked under the write lock, since another
+        station may be upgrading the same file."""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(race_times)")]
+            if "entry" not in columns:
+                self.conn.execute(ENTRY_COLUMN)
+            self.conn.execute(ENTRY_INDEX)
+
+    def close(self):
+        """Close the underlying database connection."""
+        self.conn.close()
+
+    def add_racer(self, racer):
+        """Append one racer, given as a dict keyed by the "Racer Details" headers."""
+        self.add_racers([racer])
+
+    def add_racers(self, racers):
+        """
+        Append racers (dicts keyed by the "Racer Details" headers) in one transaction.
+        A racer whose car number is already registered is skipped if it is the same racer, otherwise reported
+        in the StoreConflict raised once the others are saved.
+        """
+        insert = INSERT_RACER.format(names=", ".join(RACER_COLUMNS.values()), marks=", ".join("?" for _ in RACER_COLUMNS))
+        conflicts, rejected = [], []
+        with self.conn:
+            for racer in racers:
+                car_number = racer.get("Car Number")
+                values = tuple(racer.get(header) for header in RACER_COLUMNS)
+                if self.conn.execute(insert, values + (car_number,)).rowcount:
+                    continue
+                (saved_name,) = self.conn.execute(
+                    "SELECT racer_name FROM racer_details WHERE car_number = ? ORDER BY id", (car_number,)
+                ).fetchone()
+                if saved_name != racer.get("Racer Name"):
+                    conflicts.append(f"Car {car_number} is already registered to {saved_name}")
+                    rejected.append(racer)
+        if conflicts:
+            raise StoreConflict(conflicts, rejected)
+
+    def add_race_times(self, results):
+        """
+        Append heat results, one dict per car keyed by the "Race Times" headers, in one transaction.
+        A result whose lane or car in that heat is already taken is skipped if it matches the saved one,
+        otherwise reported in the StoreConflict raised once the others are saved.
+        """
+        conflicts, rejected = [], []
+        with self.conn:
+            for result in results:
+                heat, lane, car_number, time = (result.get(header) for header in RACE_TIME_COLUMNS)
+                if self.conn.execute(INSERT_RACE_TIME, (heat, lane, car_number, time, heat, lane, car_number)).rowcount:
+                    continue
+                saved = self.conn.execute(
+                    "SELECT lane, car_number, time FROM race_times WHERE heat = ? AND (lane = ? OR car_number = ?) ORDER BY id",
+                    (heat, lane, car_number),
+                ).fetchall()
+                if saved == [(lane, car_number, time)]:
+                    continue  # Saved before, e.g. replayed from the heat journal
+                for saved_lane, saved_car, saved_time in saved:
+                    if saved_lane == lane:
+                        conflicts.append(
+                            f"Heat {heat} lane {lane} already has car {saved_car} ({saved_time:.4f}); "
+                            f"car {car_number} ({time:.4f}) was not saved"
+                        )
+                    else:
+                        conflicts.append(f"Heat {heat}: car {car_number} already ran on lane {saved_lane}; lane {lane} was not saved")
+                    rejected.append(result)
+                    break
+        if conflicts:
+            raise StoreConflict(conflicts, rejected)
+
+    def add_heats(self, heats):
+        """
+        Save whole heats entered at this station, given as (heat number, entry id, results), in one transaction,
+        and return the heat number each one was saved under. A heat keeps its number unless another station has
+        already saved results under it; then it becomes the heat after the last one saved. The numbers are picked
+        under the write lock, so two stations never save into the same heat. An entry id that is already saved
+        (e.g. replayed from the heat journal) is not saved again; its saved heat number is returned.
+        """
+        numbers = []
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            for heat, entry, results in heats:
+                saved = self.conn.execute("SELECT heat FROM race_times WHERE entry = ? LIMIT 1", (entry,)).fetchone()
+                if saved is not None:
+                    numbers.append(saved[0])
+                    continue
+                if self.conn.execute("SELECT 1 FROM race_times WHERE heat = ? LIMIT 1", (heat,)).fetchone():
+                    (last_heat,) = self.conn.execute("SELECT MAX(heat) FROM race_times").fetchone()
+                    heat = last_heat + 1
+                self.conn.executemany(INSERT_HEAT, [
+                    (heat, result["Lane"], result["Car Number"], result["Time"], entry) for result in results
+                ])
+                numbers.append(heat)
+        return numbers
+
+    def saved_entries(self, entries):
+        """Return the entry ids, out of the given ones, that have results saved, as a set."""
+        entries = list(set(entries))
+        saved = set()
+        for start in range(0, len(entries), 500):  # Stay well under SQLite's limit on query parameters
+            chunk = entries[start:start + 500]
+            marks = ", ".join("?" for _ in chunk)
+            saved.update(entry for (entry,) in self.conn.execute(
+                f"SELECT DISTINCT entry FROM race_times WHERE entry IN ({marks})", chunk
+            ))
+        return saved
+
+    def next_heat(self):
+        """Return the number of the next heat to be run."""
+        (last_heat,) = self.conn.execute("SELECT MAX(heat) FROM race_times").fetchone()
+        return (last_heat or 0) + 1
+
+    def racer_details(self):
+        """Return the "Racer Details" table as a DataFrame."""
+        return _read(self.conn, "racer_details", RACER_COLUMNS)
+
+    def race_times(self):
+        """Return the "Race Times" table as a DataFrame."""
+        return _read(self.conn, "race_times", RACE_TIME_COLUMNS)
+
+    def heat_results(self, first, last):
+        """Return {heat: {lane: (car number, time)}} for heats first..last, read through the heat index."""
+        rows = self.conn.execute(
+            "SELECT heat, lane, car_number, time FROM race_times WHERE heat BETWEEN ? AND ? ORDER BY id", (first, last)
+        )
+        heats = {}
+        for heat, lane, car_number, time in rows:
+            heats.setdefault(heat, {})[lane] = (car_number, time)
+        return heats
+
+    def racer_names(self):
+        """Return {car number: racer name} for every registered racer, without loading pandas."""
+        return dict(self.conn.execute("SELECT car_number, racer_name FROM racer_details ORDER BY id").fetchall())
+
+    def export(self, path):
+        """Write both tables to an Excel workbook, Parquet or Feather file, chosen by the extension of path."""
+        from derby_formats import write_event
+
+        write_event(path, self.racer_details(), self.race_times())
@@ -0,0 +1,102 @@
+import os
+import queue
+import re
+import threading
+import time
+
+# One "lane=time" reading, e.g. "A=2.3456!" from lettered timers or "1=2.3456" from numbered ones.
+# Trailing place marks (!, ", #, ...) are ignored.
+READING = re.compile(r"\b([A-Ha-h1-8])\s*[=:]\s*(\d+\.\d+)")
+
+# Timers end lines with CR LF, LF or a bare CR
+LINE_END = re.compile(rb"\r\n|\r|\n")
+
+# Heats waiting for the GUI before the reader thread stops reading
+QUEUE_SIZE = 64
+
+
+def parse_timer_line(line):
+    """Return {lane number: time} for one line of timer output, or an empty dict for lines without times."""
+    times = {}
+    for lane, value in READING.findall(line):
+        lane = int(lane) if lane.isdigit() else ord(lane.upper()) - ord("A") + 1
+        time_value = float(value)
+        if time_value > 0:  # Timers report 0.0000 for empty lanes
+            times[lane] = time_value
+    return times
+
+
+def open_timer(port, baudrate=9600):
+    """
+    Open a timer connection and return (source, follow).
+    A regular file is replayed from start to end. Anything else is read as a serial port through pyserial,
+    or opened directly (e.g. a pseudo-terminal) when pyserial is not installed. follow is True when an
+    empty read means "no data yet" rather than the end of the stream.
+    """
+    if os.path.isfile(port):
+        return open(port, "rb"), False
+    try:
+        import serial
+    except ImportError:
+        return open(port, "rb", buffering=0), True
+    return serial.Serial(port, baudrate, timeout=0.5), True
+
+
+class TimerReader(threading.Thread):
+    """
+    Background thread that reads timer output line by line and puts each heat's {lane: time} dict on a bounded queue.
+    The GUI drains the queue from the Tk main loop with after(). When the reader stops, it puts the error
+    that stopped it (or None at the end of a replay) on the queue.
+    """
+
+    def __init__(self, source, follow=True, replay_delay=0.0, maxsize=QUEUE_SIZE):
+        threading.Thread.__init__(self, name="TimerReader", daemon=True)
+        self.source = source
+        self.follow = follow
+        self.replay_delay = replay_delay
+        self.results = queue.Queue(maxsize=maxsize)
+        self.stopped = threading.Event()
+
+    def stop(self):
+        """Ask the thread to stop after the current read."""
+        self.stopped.set()
+
+    def _put(self, item):
+        """Put item on the queue, waiting while it is full unless the reader is stopped."""
+        while not self.stopped.is_set():
+            try:
+                self.results.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _parse(self, line):
+        times = parse_timer_line(line.decode("ascii", errors="replace"))
+        if times:
+            self._put(times)
+            if self.replay_delay:
+                time.sleep(self.replay_delay)
+
+    def run(self):
+        error = None
+        pending = b""  # Start of a line whose end has not arrived yet
+        try:
+            while not self.stopped.is_set():
+                chunk = self.source.readline()
+                if not chunk:
+                    if self.follow:
+                        continue  # Serial read timed out with no heat finished
+                    break
+
+                # A serial read that times out mid-line (a timer printing each lane as its car finishes) returns
+                # part of a line; only complete lines are parsed, so one heat is never split in two
+                *lines, pending = LINE_END.split(pending + chunk)
+                for line in lines:
+                    self._parse(line)
+            if pending and not self.stopped.is_set():
+                self._parse(pending)  # Last line of a replay without a line ending
+        except (OSError, ValueError) as e:
+            error = e
+        finally:
+            self.source.close()
+        self._put(error)
@@ -0,0 +1,87 @@
+import os
+
+import pandas as pd
+
+from derby_store import RACER_COLUMNS, RACE_TIME_COLUMNS
+
+
+class WorkbookCache:
+    """
+    Keeps the parsed sheets of each workbook in memory.
+    A workbook is parsed again only when its modification time or size changes; every sheet is parsed in the same pass.
+    """
+
+    def __init__(self):
+        self._workbooks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def read_sheets(self, path):
+        """Return {sheet name: DataFrame} for every sheet in the workbook at path."""
+        info = os.stat(path)
+        key = os.path.abspath(path)
+        signature = (info.st_mtime_ns, info.st_size)
+
+        cached = self._workbooks.get(key)
+        if cached is not None and cached[0] == signature:
+            self.hits += 1
+            sheets = cached[1]
+        else:
+            self.misses += 1
+            sheets = pd.read_excel(path, sheet_name=None, engine="openpyxl")
+            self._workbooks[key] = (signature, sheets)
+
+        # Callers get copies so they cannot change the cached frames
+        return {name: df.copy() for name, df in sheets.items()}
+
+    def read_sheet(self, path, sheet_name):
+        """Return one sheet of the workbook at path."""
+        sheets = self.read_sheets(path)
+        if sheet_name not in sheets:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        return sheets[sheet_name]
+
+    def clear(self):
+        """Forget every cached workbook."""
+        self._workbooks.clear()
+
+    def stats(self):
+        """Return the hit and miss counters and the number of cached workbooks."""
+        return {"hits": self.hits, "misses": self.misses, "workbooks": len(self._workbooks)}
+
+
+def legacy_race_times(racer_df, df):
+    """Convert a "Race Times" sheet with a column pair per racer (Racer 1 - Lane, Racer 1 - Time, ...) to one row per car per race."""
+    car_numbers = {}
+    if "Racer Number" in racer_df.columns:
+        car_numbers = dict(zip(racer_df["Racer Number"].astype(str), racer_df.get("Car Number", racer_df["Racer Number"])))
+
+    frames = []
+    racer = 1
+    while f"Racer {racer} - Lane" in df.columns:
+        frames.append(pd.DataFrame({
+            "Heat": df["Race #"],
+            "Lane": df[f"Racer {racer} - Lane"],
+            "Car Number": car_numbers.get(str(racer), racer),
+            "Time": df[f"Racer {racer} - Time"],
+        }))
+        racer += 1
+
+    if not frames:
+        return pd.DataFrame(columns=list(RACE_TIME_COLUMNS))
+    return pd.concat(frames, ignore_index=True).sort_values(["Heat", "Lane"], kind="stable")
+
+
+def read_event(path, cache=None):
+    """
+    Return (racer details, race times) from an event workbook, with race times one row per car per heat per lane.
+    Workbooks from before the long format, with a column pair per racer, are converted.
+    """
+    sheets = (cache or WorkbookCache()).read_sheets(path)
+    racer_df = sheets.get("Racer Details", pd.DataFrame(columns=list(RACER_COLUMNS)))
+    df = sheets.get("Race Times", pd.DataFrame(columns=list(RACE_TIME_COLUMNS)))
+    df.columns = df.columns.str.strip()
+
+    if "Racer 1 - Lane" in df.columns:
+        df = legacy_race_times(racer_df, df)
+    return racer_df, df
@@ -0,0 +1,106 @@
+import queue
+import threading
+
+from derby_store import RaceStore
+
+# Queued by close() to stop the worker after the jobs ahead of it
+STOP = object()
+
+
+class StoreWorker(threading.Thread):
+    """
+    Single writer thread that owns a RaceStore and runs reads and writes off the Tk main loop.
+    Jobs run in the order they were submitted. Heats queued back to back are written in one transaction.
+    Completion callbacks are handed back to the main loop, which calls poll() from after().
+    With a heat journal, results already written are compacted out of it every so often.
+    """
+
+    def __init__(self, path, journal=None):
+        threading.Thread.__init__(self, name="StoreWorker", daemon=True)
+        self.path = path
+        self.journal = journal
+        self.jobs = queue.Queue()
+        self.finished = queue.Queue()
+        self.pending = 0  # Jobs submitted and not yet reported back through poll()
+
+    def submit(self, job, on_done=None, on_error=None):
+        """Run job(store) on the worker thread, then on_done(result) or on_error(exception) from poll()."""
+        self.pending += 1
+        self.jobs.put((job, None, on_done, on_error))
+
+    def add_heat(self, heat, entry, results, on_done=None, on_error=None):
+        """
+        Save one entered heat (see RaceStore.add_heats); on_done gets the heat number it was saved under.
+        Consecutive calls are coalesced into one write.
+        """
+        self.pending += 1
+        self.jobs.put((None, (heat, entry, results), on_done, on_error))
+
+    def close(self):
+        """Finish the queued jobs, then stop the thread."""
+        self.jobs.put(STOP)
+
+    def poll(self):
+        """Run the callbacks of finished jobs. Call this from the main loop only."""
+        while True:
+            try:
+                callback, value = self.finished.get_nowait()
+            except queue.Empty:
+                return
+            self.pending -= 1
+            if callback is not None:
+                callback(value)
+
+    def _report(self, items, error=None, results=None):
+        """Queue the on_done (with each job's result) or on_error callback of each finished job for the main loop."""
+        for index, (_job, _heat, on_done, on_error) in enumerate(items):
+            if error is None:
+                self.finished.put((on_done, results[index] if results is not None else None))
+            else:
+                self.finished.put((on_error, error))
+
+    def _compact(self, store):
+        """Compact the heat journal once enough heats are in; it stays valid if this fails, so just try again later."""
+        if self.journal is None or not self.journal.needs_compaction():
+            return
+        try:
+            self.journal.compact(store)
+        except OSError:
+            pass
+
+    def run(self):
+        store = RaceStore(self.path)
+        item = self.jobs.get()
+        while item is not STOP:
+            job = item[0]
+            if job is not None:
+                try:
+                    self._report([item], results=[job(store)])
+                except Exception as e:
+                    self._report([item], error=e)
+                item = self.jobs.get()
+                continue
+
+            # Gather every heat already waiting behind this one into a single transaction
+            batch = [item]
+            item = None
+            while item is None:
+                try:
+                    following = self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if following is not STOP and following[0] is None:
+                    batch.append(following)
+                else:
+                    item = following
+
+            try:
+                self._report(batch, results=store.add_heats([queued[1] for queued in batch]))
+            except Exception as e:
+                self._report(batch, error=e)
+            else:
+                self._compact(store)
+
+            if item is None:
+                item = self.jobs.get()
+        store.close()
@@ -0,0 +1,104 @@
+"""
+Round-trip tests for the export formats on a small event. Run with: python -m pytest -q
+"""
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+import derby_formats
+from derby_store import RACER_COLUMNS, RACE_TIME_COLUMNS
+
+RACERS = pd.DataFrame({
+    "Racer Name": ["Ada", "Ben", "Cy"],
+    "Boy Scout Rank": ["Wolf", "Bear", ""],
+    "Car Name": ["Comet", "Bolt", "Zip"],
+    "Car Number": [7, 12, 301],
+    "Car Weight": ["5.0 oz", "4.9 oz", ""],
+    "Mods": ["[polished axles]", "", "[3 wheel rail rider]"],
+})
+
+RACE_TIMES = pd.DataFrame({
+    "Heat": [1, 1, 1, 2, 2, 2],
+    "Lane": [1, 2, 3, 1, 2, 3],
+    "Car Number": [7, 12, 301, 12, 301, 7],
+    "Time": [2.5012, 2.6123, 2.7234, 2.5345, 2.6456, 2.7567],
+})
+
+
+class FormatRoundTripTests(unittest.TestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+
+    def round_trip(self, extension):
+        path = os.path.join(self.folder, f"event{extension}")
+        derby_formats.write_event(path, RACERS, RACE_TIMES)
+        return path, derby_formats.read_event_file(path)
+
+    def assert_race_times(self, df):
+        self.assertEqual(list(df.columns), list(RACE_TIME_COLUMNS))
+        self.assertEqual(df[["Heat", "Lane", "Car Number"]].values.tolist(),
+                         RACE_TIMES[["Heat", "Lane", "Car Number"]].values.tolist())
+        for time, expected in zip(df["Time"], RACE_TIMES["Time"]):
+            self.assertAlmostEqual(float(time), expected, places=4)
+
+    def assert_racers(self, racer_df):
+        self.assertEqual(list(racer_df.columns), list(RACER_COLUMNS))
+        self.assertEqual(racer_df["Car Number"].tolist(), RACERS["Car Number"].tolist())
+        for header in ("Racer Name", "Car Name", "Mods"):
+            self.assertEqual(racer_df[header].tolist(), RACERS[header].tolist())
+
+    def test_columnar_types(self):
+        for extension in derby_formats.COLUMNAR_FORMATS:
+            with self.subTest(extension=extension):
+                path, (racer_df, df) = self.round_trip(extension)
+                self.assertEqual({column: str(dtype) for column, dtype in df.dtypes.items()},
+                                 derby_formats.RACE_TIME_TYPES)
+                self.assertEqual(str(racer_df["Car Number"].dtype), "int16")
+                self.assert_race_times(df)
+
+    def test_columnar_racers_file(self):
+        for extension in derby_formats.COLUMNAR_FORMATS:
+            with self.subTest(extension=extension):
+                path, (racer_df, _) = self.round_trip(extension)
+                self.assertTrue(os.path.exists(derby_formats.racers_path(path)))
+                self.assertEqual(derby_formats.racers_path(path), os.path.join(self.folder, f"event.racers{extension}"))
+                self.assert_racers(racer_df)
+
+    def test_columnar_missing_racers_file(self):
+        for extension in derby_formats.COLUMNAR_FORMATS:
+            with self.subTest(extension=extension):
+                path, _ = self.round_trip(extension)
+                os.remove(derby_formats.racers_path(path))
+                racer_df, df = derby_formats.read_event_file(path)
+                self.assertTrue(racer_df.empty)
+                self.assertEqual(list(racer_df.columns), list(RACER_COLUMNS))
+                self.assert_race_times(df)
+
+    def test_xlsx(self):
+        _, (racer_df, df) = self.round_trip(".xlsx")
+        self.assert_race_times(derby_formats.typed_race_times(df))
+        self.assertEqual(pd.to_numeric(racer_df["Car Number"]).tolist(), RACERS["Car Number"].tolist())
+
+    def test_no_temporary_files_left(self):
+        for extension in derby_formats.FORMATS:
+            self.round_trip(extension)
+        self.assertEqual(sorted(os.listdir(self.folder)), sorted([
+            "event.xlsx", "event.parquet", "event.racers.parquet", "event.feather", "event.racers.feather",
+        ]))
+
+    def test_rows_without_a_time_are_dropped(self):
+        df = pd.concat([RACE_TIMES, pd.DataFrame([{"Heat": 3, "Lane": 1, "Car Number": 7, "Time": None}])])
+        self.assertEqual(len(derby_formats.typed_race_times(df)), len(RACE_TIMES))
+
+    def test_unsupported_extension(self):
+        with self.assertRaises(ValueError):
+            derby_formats.file_format("event.csv")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+Tests for the heat journal: reading it back after a crash, replaying it into a race data file and compacting it.
+Run with: python -m pytest -q
+"""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from derby_journal import JOURNAL_DIR_ENV, HeatJournal, journal_path
+from derby_store import RaceStore
+
+
+def result(heat, lane, car_number, time):
+    return {"Heat": heat, "Lane": lane, "Car Number": car_number, "Time": time}
+
+
+class HeatJournalTests(unittest.TestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+        self.journal = HeatJournal(os.path.join(self.folder, "event.station.journal"))
+        self.store = RaceStore(os.path.join(self.folder, "event.db"))
+        self.addCleanup(self.store.close)
+
+    def test_entries_in_order(self):
+        self.journal.append(1, "a", [result(1, 1, 11, 2.5)])
+        self.journal.append(2, "b", [result(2, 1, 12, 2.6), result(2, 2, 11, 2.7)])
+        self.assertEqual([entry["heat"] for entry in self.journal.entries()], [1, 2])
+        self.assertEqual(self.journal.entries()[1],
+                         {"heat": 2, "entry": "b", "results": [result(2, 1, 12, 2.6), result(2, 2, 11, 2.7)]})
+        self.assertEqual(self.journal.appended, 2)
+
+    def test_no_journal(self):
+        self.assertEqual(self.journal.entries(), [])
+        self.assertEqual(self.journal.replay(self.store), [])
+
+    def test_torn_last_line_is_skipped(self):
+        self.journal.append(1, "a", [result(1, 1, 11, 2.5)])
+        line = json.dumps({"heat": 2, "entry": "b", "results": [result(2, 1, 12, 2.6)]})
+        with open(self.journal.path, "a", encoding="utf-8") as journal:
+            journal.write(line[:len(line) // 2])  # Crash part way through the append
+        self.assertEqual([entry["heat"] for entry in self.journal.entries()], [1])
+
+    def test_replay_writes_missing_heats(self):
+        self.journal.append(1, "a", [result(1, 1, 11, 2.5), result(1, 2, 12, 2.6)])
+        self.journal.append(2, "b", [result(2, 1, 12, 2.7)])
+        self.assertEqual(self.journal.replay(self.store), [1, 2])
+        self.assertEqual(self.store.heat_results(1, 2), {1: {1: (11, 2.5), 2: (12, 2.6)}, 2: {1: (12, 2.7)}})
+        self.assertFalse(os.path.exists(self.journal.path))
+
+    def test_replay_skips_saved_heats(self):
+        self.store.add_heats([(1, "a", [result(1, 1, 11, 2.5), result(1, 2, 12, 2.6)])])
+        self.journal.append(1, "a", [result(1, 1, 11, 2.5), result(1, 2, 12, 2.6)])
+        self.journal.append(2, "b", [result(2, 1, 12, 2.7)])
+        self.assertEqual(self.journal.replay(self.store), [2])
+        self.assertEqual(len(self.store.race_times()), 3)
+
+    def test_replay_renumbers_a_heat_another_station_saved(self):
+        # Another station saved its own car under heat 5; this station's heat 5 is saved as the next heat
+        self.store.add_heats([(5, "other", [result(5, 2, 22, 2.6)])])
+        self.journal.append(5, "mine", [result(5, 1, 11, 2.5)])
+        self.assertEqual(self.journal.replay(self.store), [6])
+        self.assertEqual(self.store.heat_results(5, 6), {5: {2: (22, 2.6)}, 6: {1: (11, 2.5)}})
+
+    def test_replay_after_renumbering_saves_nothing_twice(self):
+        self.store.add_heats([(3, "other", [result(3, 1, 45, 2.8)])])
+        self.assertEqual(self.store.add_heats([(3, "mine", [result(3, 1, 44, 2.7)])]), [4])
+        self.journal.append(3, "mine", [result(3, 1, 44, 2.7)])
+        self.assertEqual(self.journal.replay(self.store), [])
+        self.assertEqual(len(self.store.race_times()), 2)
+
+    def test_compact_keeps_only_unsaved_heats(self):
+        self.journal.append(1, "a", [result(1, 1, 11, 2.5)])
+        self.journal.append(2, "b", [result(2, 1, 12, 2.6), result(2, 2, 11, 2.7)])
+        self.journal.append(3, "c", [result(3, 1, 13, 2.8)])
+        self.store.add_heats([(1, "a", [result(1, 1, 11, 2.5)])])
+
+        self.journal.compact(self.store)
+        self.assertEqual(self.journal.entries(), [
+            {"heat": 2, "entry": "b", "results": [result(2, 1, 12, 2.6), result(2, 2, 11, 2.7)]},
+            {"heat": 3, "entry": "c", "results": [result(3, 1, 13, 2.8)]},
+        ])
+        self.assertEqual(self.journal.appended, 0)
+        self.assertFalse(os.path.exists(f"{self.journal.path}.tmp"))
+
+    def test_compact_matches_the_entry_not_the_heat_number(self):
+        # Another station's heat 1 is not this station's heat 1
+        self.journal.append(1, "mine", [result(1, 1, 11, 2.5)])
+        self.store.add_heats([(1, "other", [result(1, 1, 11, 2.5)])])
+        self.journal.compact(self.store)
+        self.assertEqual([entry["entry"] for entry in self.journal.entries()], ["mine"])
+
+    def test_compact_removes_a_fully_saved_journal(self):
+        self.journal.append(1, "a", [result(1, 1, 11, 2.5)])
+        self.store.add_heats([(1, "a", [result(1, 1, 11, 2.5)])])
+        self.journal.compact(self.store)
+        self.assertFalse(os.path.exists(self.journal.path))
+
+    def test_needs_compaction(self):
+        journal = HeatJournal(self.journal.path, compact_heats=2)
+        journal.append(1, "a", [result(1, 1, 11, 2.5)])
+        self.assertFalse(journal.needs_compaction())
+        journal.append(2, "b", [result(2, 1, 11, 2.6)])
+        self.assertTrue(journal.needs_compaction())
+
+
+class JournalPathTests(unittest.TestCase):
+
+    def setUp(self):
+        patch = mock.patch.dict(os.environ, {JOURNAL_DIR_ENV: "/local/journals"})
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_kept_in_the_journal_folder_not_next_to_the_file(self):
+        path = journal_path("/mnt/share/Pack 12 Derby.db", "front desk")
+        self.assertEqual(os.path.dirname(path), "/local/journals")
+        self.assertRegex(os.path.basename(path), r"^Pack_12_Derby-[0-9a-f]{16}\.journal$")
+
+    def test_one_journal_per_file_and_station(self):
+        path = journal_path("/mnt/share/event.db", "a")
+        self.assertEqual(journal_path("/mnt/share/../share/event.db", "a"), path)
+        self.assertNotEqual(journal_path("/mnt/share/event.db", "b"), path)
+        self.assertNotEqual(journal_path("/mnt/other/event.db", "a"), path)
+
+    def test_append_creates_the_folder(self):
+        with tempfile.TemporaryDirectory() as folder:
+            journal = HeatJournal(os.path.join(folder, "journals", "event.journal"))
+            journal.append(1, "a", [result(1, 1, 11, 2.5)])
+            self.assertEqual(len(journal.entries()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
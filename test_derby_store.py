@@ -0,0 +1,229 @@
+"""
+Tests for the race data file: saves replayed or entered at several stations, the unique indexes, heat numbering,
+the journal mode and the background writer. Run with: python -m pytest -q
+"""
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from derby_store import RaceStore, StoreConflict, read_archive
+from derby_worker import StoreWorker
+
+# Longest wait for the background writer in these tests
+WAIT = 5
+
+
+def result(heat, lane, car_number, time):
+    return {"Heat": heat, "Lane": lane, "Car Number": car_number, "Time": time}
+
+
+def racer(car_number, name):
+    return {"Racer Name": name, "Boy Scout Rank": "Wolf", "Car Name": f"{name}'s car", "Car Number": car_number,
+            "Car Weight": "5.0 oz", "Mods": ""}
+
+
+class StoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.path = os.path.join(folder.name, "event.db")
+        self.store = self.open_store()
+
+    def open_store(self, *args):
+        store = RaceStore(self.path, *args)
+        self.addCleanup(store.close)
+        return store
+
+
+class AddRacersTests(StoreTestCase):
+
+    def test_identical_replay_is_skipped(self):
+        self.store.add_racers([racer(7, "Ada"), racer(12, "Ben")])
+        self.store.add_racers([racer(7, "Ada"), racer(12, "Ben")])
+        self.assertEqual(self.store.racer_names(), {7: "Ada", 12: "Ben"})
+
+    def test_differing_racer_raises_after_the_others_are_saved(self):
+        self.store.add_racer(racer(7, "Ada"))
+        with self.assertRaises(StoreConflict) as caught:
+            self.store.add_racers([racer(12, "Ben"), racer(7, "Cy"), racer(30, "Dee")])
+        self.assertEqual(caught.exception.rows, [racer(7, "Cy")])
+        self.assertEqual(caught.exception.conflicts, ["Car 7 is already registered to Ada"])
+        self.assertEqual(self.store.racer_names(), {7: "Ada", 12: "Ben", 30: "Dee"})
+
+
+class AddRaceTimesTests(StoreTestCase):
+
+    def test_identical_replay_is_skipped(self):
+        self.store.add_race_times([result(1, 1, 11, 2.5), result(1, 2, 12, 2.6)])
+        self.store.add_race_times([result(1, 1, 11, 2.5), result(1, 2, 12, 2.6)])
+        self.assertEqual(len(self.store.race_times()), 2)
+
+    def test_differing_rows_raise_after_the_others_are_saved(self):
+        self.store.add_race_times([result(1, 1, 11, 2.5)])
+        lane_taken, car_taken = result(1, 1, 12, 2.6), result(1, 3, 11, 2.7)
+        with self.assertRaises(StoreConflict) as caught:
+            self.store.add_race_times([lane_taken, result(1, 2, 13, 2.8), car_taken, result(2, 1, 11, 2.9)])
+        self.assertEqual(caught.exception.rows, [lane_taken, car_taken])
+        self.assertIn("Heat 1 lane 1 already has car 11", caught.exception.conflicts[0])
+        self.assertIn("Heat 1: car 11 already ran on lane 1", caught.exception.conflicts[1])
+        self.assertEqual(self.store.heat_results(1, 2), {1: {1: (11, 2.5), 2: (13, 2.8)}, 2: {1: (11, 2.9)}})
+
+    def test_same_time_on_another_lane_is_a_conflict(self):
+        self.store.add_race_times([result(1, 1, 11, 2.5)])
+        with self.assertRaises(StoreConflict):
+            self.store.add_race_times([result(1, 2, 11, 2.5)])
+
+
+class UniqueIndexTests(StoreTestCase):
+
+    def test_duplicates_are_refused_by_the_file(self):
+        self.store.add_race_times([result(1, 1, 11, 2.5)])
+        self.store.add_racer(racer(7, "Ada"))
+        insert = "INSERT INTO race_times (heat, lane, car_number, time) VALUES (?, ?, ?, ?)"
+        with self.assertRaises(sqlite3.IntegrityError):
+            with self.store.conn:
+                self.store.conn.execute(insert, (1, 1, 12, 2.6))  # Lane taken
+        with self.assertRaises(sqlite3.IntegrityError):
+            with self.store.conn:
+                self.store.conn.execute(insert, (1, 2, 11, 2.6))  # Car already ran
+        with self.assertRaises(sqlite3.IntegrityError):
+            with self.store.conn:
+                self.store.conn.execute("INSERT INTO racer_details (racer_name, car_number) VALUES ('Ben', 7)")
+        self.assertEqual(len(self.store.race_times()), 1)
+
+    def test_older_file_with_duplicates_still_opens(self):
+        self.store.close()
+        os.remove(self.path)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE race_times (id INTEGER PRIMARY KEY, heat INTEGER, lane INTEGER, car_number INTEGER, time REAL)")
+        conn.executemany("INSERT INTO race_times (heat, lane, car_number, time) VALUES (?, ?, ?, ?)",
+                         [(1, 1, 11, 2.5), (1, 1, 12, 2.6)])
+        conn.commit()
+        conn.close()
+
+        store = self.open_store()
+        self.assertEqual(len(store.race_times()), 2)
+        with self.assertRaises(StoreConflict):
+            store.add_race_times([result(1, 1, 13, 2.7)])
+
+
+class AddHeatsTests(StoreTestCase):
+
+    def test_heat_keeps_a_free_number(self):
+        self.assertEqual(self.store.add_heats([(1, "a", [result(1, 1, 11, 2.5)]), (2, "b", [result(2, 1, 12, 2.6)])]),
+                         [1, 2])
+        self.assertEqual(self.store.next_heat(), 3)
+
+    def test_heat_another_station_saved_is_renumbered(self):
+        other = self.open_store()
+        other.add_heats([(4, "other", [result(4, 2, 22, 2.6)]), (5, "other 2", [result(5, 1, 23, 2.7)])])
+        self.assertEqual(self.store.add_heats([(4, "mine", [result(4, 1, 11, 2.5)])]), [6])
+        self.assertEqual(self.store.heat_results(4, 6), {4: {2: (22, 2.6)}, 5: {1: (23, 2.7)}, 6: {1: (11, 2.5)}})
+
+    def test_saved_entry_is_not_saved_again(self):
+        self.store.add_heats([(1, "other", [result(1, 1, 21, 2.4)])])
+        self.assertEqual(self.store.add_heats([(1, "mine", [result(1, 1, 11, 2.5)])]), [2])
+        self.assertEqual(self.store.add_heats([(1, "mine", [result(1, 1, 11, 2.5)])]), [2])
+        self.assertEqual(len(self.store.race_times()), 2)
+        self.assertEqual(self.store.saved_entries(["mine", "other", "lost"]), {"mine", "other"})
+
+    def test_older_file_gets_the_entry_column(self):
+        self.store.close()
+        os.remove(self.path)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE race_times (id INTEGER PRIMARY KEY, heat INTEGER, lane INTEGER, car_number INTEGER, time REAL)")
+        conn.execute("INSERT INTO race_times (heat, lane, car_number, time) VALUES (1, 1, 11, 2.5)")
+        conn.commit()
+        conn.close()
+
+        store = self.open_store()
+        self.assertEqual(store.add_heats([(1, "a", [result(1, 1, 12, 2.6)])]), [2])
+        self.assertEqual(store.heat_results(1, 2), {1: {1: (11, 2.5)}, 2: {1: (12, 2.6)}})
+
+
+class JournalModeTests(StoreTestCase):
+
+    def test_requested_mode(self):
+        store = self.open_store("wal")
+        self.assertEqual((store.journal_mode, store.requested_journal_mode), ("wal", "wal"))
+
+    def test_file_held_in_wal_keeps_its_mode(self):
+        self.store.close()
+        self.open_store("wal")
+        store = self.open_store("delete")
+        self.assertEqual((store.journal_mode, store.requested_journal_mode), ("wal", "delete"))
+        self.assertEqual(store.add_heats([(1, "a", [result(1, 1, 11, 2.5)])]), [1])
+
+    def test_unsupported_mode(self):
+        with self.assertRaises(ValueError):
+            RaceStore(self.path, "memory")
+
+    def test_archive_is_read_without_changes(self):
+        self.store.add_heats([(1, "a", [result(1, 1, 11, 2.5)])])
+        self.store.close()
+        before = os.path.getmtime(self.path)
+        racer_df, df = read_archive(self.path)
+        self.assertTrue(racer_df.empty)
+        self.assertEqual(df.values.tolist(), [[1, 1, 11, 2.5]])
+        self.assertEqual(os.path.getmtime(self.path), before)
+
+
+class StoreWorkerTests(StoreTestCase):
+
+    def setUp(self):
+        StoreTestCase.setUp(self)
+        self.worker = StoreWorker(self.path)
+        self.done, self.errors = [], []
+
+    def finish(self):
+        self.worker.start()
+        deadline = time.monotonic() + WAIT
+        while self.worker.pending and time.monotonic() < deadline:
+            self.worker.poll()
+            time.sleep(0.001)
+        self.worker.close()
+        self.worker.join(WAIT)
+        self.assertEqual(self.worker.pending, 0)
+
+    def add_heat(self, heat, entry, results):
+        self.worker.add_heat(heat, entry, results,
+                             on_done=lambda saved: self.done.append((entry, saved)),
+                             on_error=lambda error: self.errors.append((entry, error)))
+
+    def test_each_heat_of_a_batch_gets_its_own_number(self):
+        # Queued before the thread starts, so the three heats are written in one transaction
+        self.store.add_heats([(2, "other", [result(2, 1, 21, 2.4)])])
+        self.add_heat(1, "a", [result(1, 1, 11, 2.5)])
+        self.add_heat(2, "b", [result(2, 1, 12, 2.6)])
+        self.add_heat(3, "c", [result(3, 1, 13, 2.7)])
+        self.finish()
+        self.assertEqual(self.done, [("a", 1), ("b", 3), ("c", 4)])
+        self.assertEqual(self.errors, [])
+
+    def test_failed_batch_reports_every_heat(self):
+        self.add_heat(1, "a", [result(1, 1, 11, 2.5)])
+        self.add_heat(2, "b", [result(2, 1, 12, 2.6), result(2, 2, 12, 2.7)])  # Same car twice
+        self.finish()
+        self.assertEqual(self.done, [])
+        self.assertEqual([entry for entry, _ in self.errors], ["a", "b"])
+        self.assertIsInstance(self.errors[0][1], sqlite3.IntegrityError)
+        self.assertEqual(len(self.store.race_times()), 0)
+
+    def test_racer_conflict_reaches_only_its_job(self):
+        self.store.add_racer(racer(7, "Ada"))
+        for car_number, name in ((12, "Ben"), (7, "Cy")):
+            self.worker.submit(lambda store, new=racer(car_number, name): store.add_racer(new),
+                               on_done=lambda _, name=name: self.done.append(name),
+                               on_error=lambda error, name=name: self.errors.append((name, error)))
+        self.finish()
+        self.assertEqual(self.done, ["Ben"])
+        self.assertEqual([name for name, _ in self.errors], ["Cy"])
+        self.assertIsInstance(self.errors[0][1], StoreConflict)
+        self.assertEqual(self.store.racer_names(), {7: "Ada", 12: "Ben"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+"""
+Tests for the electronic timer reader, fed from a recorded timer file and from a pseudo-terminal standing in
+for the serial port. Run with: python -m pytest -q
+"""
+import os
+import pty
+import queue
+import tempfile
+import time
+import unittest
+
+from derby_timer import TimerReader, open_timer, parse_timer_line
+
+# Longest wait for the reader thread in these tests
+WAIT = 5
+
+
+class ParseTimerLineTests(unittest.TestCase):
+
+    def test_lettered_lanes(self):
+        self.assertEqual(parse_timer_line("A=2.3456 B=2.4567 C=2.5678"), {1: 2.3456, 2: 2.4567, 3: 2.5678})
+
+    def test_lowercase_letters(self):
+        self.assertEqual(parse_timer_line("a=2.3456 b=2.4567"), {1: 2.3456, 2: 2.4567})
+
+    def test_numbered_lanes(self):
+        self.assertEqual(parse_timer_line("1=2.3456 2=2.4567 3=2.5678 4=2.6789"),
+                         {1: 2.3456, 2: 2.4567, 3: 2.5678, 4: 2.6789})
+
+    def test_colon_separator(self):
+        self.assertEqual(parse_timer_line("1:3.1000 2: 3.2000"), {1: 3.1, 2: 3.2})
+
+    def test_empty_lanes_report_zero(self):
+        self.assertEqual(parse_timer_line("A=2.3456 B=0.0000 C=2.5678 D=0.0000"), {1: 2.3456, 3: 2.5678})
+
+    def test_trailing_place_marks(self):
+        self.assertEqual(parse_timer_line('A=2.3456! B=2.4567" C=2.5678# D=2.6789$'),
+                         {1: 2.3456, 2: 2.4567, 3: 2.5678, 4: 2.6789})
+
+    def test_line_ending(self):
+        self.assertEqual(parse_timer_line("A=2.3456 B=2.4567\r\n"), {1: 2.3456, 2: 2.4567})
+
+    def test_lines_without_times(self):
+        self.assertEqual(parse_timer_line(""), {})
+        self.assertEqual(parse_timer_line("Ready"), {})
+        self.assertEqual(parse_timer_line("A=0.0000 B=0.0000"), {})
+
+
+class TimerReaderReplayTests(unittest.TestCase):
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.path = os.path.join(folder.name, "timer.txt")
+
+    def replay(self, text):
+        with open(self.path, "wb") as recording:
+            recording.write(text)
+        source, follow = open_timer(self.path)
+        self.assertFalse(follow)
+        reader = TimerReader(source, follow)
+        reader.start()
+        return reader
+
+    def test_replays_every_heat_then_none(self):
+        reader = self.replay(b"Ready\r\nA=2.3456! B=2.4567 C=0.0000\r\n\r\n1=3.1000 2=3.2000\r\n")
+        self.assertEqual(reader.results.get(timeout=WAIT), {1: 2.3456, 2: 2.4567})
+        self.assertEqual(reader.results.get(timeout=WAIT), {1: 3.1, 2: 3.2})
+        self.assertIsNone(reader.results.get(timeout=WAIT))
+        reader.join(WAIT)
+        self.assertFalse(reader.is_alive())
+        self.assertTrue(reader.source.closed)
+
+    def test_last_line_without_line_ending(self):
+        reader = self.replay(b"A=2.3456 B=2.4567\r\nA=3.1000")
+        self.assertEqual(reader.results.get(timeout=WAIT), {1: 2.3456, 2: 2.4567})
+        self.assertEqual(reader.results.get(timeout=WAIT), {1: 3.1})
+        self.assertIsNone(reader.results.get(timeout=WAIT))
+
+    def test_empty_replay(self):
+        reader = self.replay(b"")
+        self.assertIsNone(reader.results.get(timeout=WAIT))
+        reader.join(WAIT)
+        self.assertFalse(reader.is_alive())
+
+    def test_stop_while_queue_is_full(self):
+        reader = TimerReader(open(self.path, "wb+"), follow=False, maxsize=1)
+        reader.source.write(b"A=2.5000\n" * 5)
+        reader.source.seek(0)
+        reader.start()
+
+        # The reader is blocked on the full queue; stop() lets it finish without queueing anything more
+        self.assertEqual(reader.results.get(timeout=WAIT), {1: 2.5})
+        reader.stop()
+        reader.join(WAIT)
+        self.assertFalse(reader.is_alive())
+        self.assertTrue(reader.source.closed)
+        self.assertLessEqual(reader.results.qsize(), 1)
+
+
+class TimerReaderPseudoTerminalTests(unittest.TestCase):
+
+    def setUp(self):
+        self.master, slave = pty.openpty()
+        self.port = os.ttyname(slave)
+        os.close(slave)
+        self.addCleanup(self.close_master)
+
+    def close_master(self):
+        if self.master is not None:
+            os.close(self.master)
+            self.master = None
+
+    def connect(self):
+        source, follow = open_timer(self.port)
+        self.assertTrue(follow)
+        reader = TimerReader(source, follow)
+        reader.start()
+        return reader
+
+    def test_reads_heats_as_they_finish(self):
+        reader = self.connect()
+        os.write(self.master, b"A=2.3456 B=2.4567 C=0.0000\r\n")
+        self.assertEqual(reader.results.get(timeout=WAIT), {1: 2.3456, 2: 2.4567})
+        os.write(self.master, b"1=3.1000! 2=3.2000\r\n")
+        self.assertEqual(reader.results.get(timeout=WAIT), {1: 3.1, 2: 3.2})
+        with self.assertRaises(queue.Empty):
+            reader.results.get(timeout=0.1)
+
+        reader.stop()
+        os.write(self.master, b"\r\n")  # Ends a read that has no timeout (a pty opened without pyserial)
+        reader.join(WAIT)
+        self.assertFalse(reader.is_alive())
+        self.assertTrue(reader.results.empty())
+
+    def test_line_split_by_a_pause(self):
+        reader = self.connect()
+
+        # Longer than pyserial's read timeout, as when each lane is printed as its car crosses the line
+        os.write(self.master, b"A=2.3456")
+        time.sleep(0.8)
+        os.write(self.master, b" B=2.4567\r\n")
+        self.assertEqual(reader.results.get(timeout=WAIT), {1: 2.3456, 2: 2.4567})
+        with self.assertRaises(queue.Empty):
+            reader.results.get(timeout=0.1)
+        reader.stop()
+        os.write(self.master, b"\r\n")
+        reader.join(WAIT)
+
+    def test_bare_carriage_returns(self):
+        reader = self.connect()
+        os.write(self.master, b"A=2.3456 B=2.4567\rA=3.1000 B=3.2000\r")
+        self.assertEqual(reader.results.get(timeout=WAIT), {1: 2.3456, 2: 2.4567})
+        self.assertEqual(reader.results.get(timeout=WAIT), {1: 3.1, 2: 3.2})
+        reader.stop()
+        os.write(self.master, b"\r\n")
+        reader.join(WAIT)
+
+    def test_hangup_reports_the_error(self):
+        reader = self.connect()
+        os.write(self.master, b"A=2.3456\r\n")
+        self.assertEqual(reader.results.get(timeout=WAIT), {1: 2.3456})
+
+        # Closing the other end is the timer's cable being pulled
+        self.close_master()
+        self.assertIsInstance(reader.results.get(timeout=WAIT), OSError)
+        reader.join(WAIT)
+        self.assertFalse(reader.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()